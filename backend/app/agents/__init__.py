@@ -9,23 +9,39 @@ from app.agents.prescription_validation import PrescriptionValidationAgent
 from app.agents.order_processing import OrderProcessingAgent
 from app.agents.compliance_safety import ComplianceSafetyAgent
 
-# Agent instances
-orchestrator = OrchestratorAgent()
-customer_support = CustomerSupportAgent()
-medicine_search = MedicineSearchAgent()
-prescription_validation = PrescriptionValidationAgent()
-order_processing = OrderProcessingAgent()
-compliance_safety = ComplianceSafetyAgent()
+# Agent singletons are created lazily (PEP 562) so importing this package
+# doesn't pay for six agent constructions before any request is served.
+_AGENT_CLASSES = {
+    "orchestrator": OrchestratorAgent,
+    "customer_support": CustomerSupportAgent,
+    "medicine_search": MedicineSearchAgent,
+    "prescription_validation": PrescriptionValidationAgent,
+    "order_processing": OrderProcessingAgent,
+    "compliance_safety": ComplianceSafetyAgent,
+}
+
+_instances: dict = {}
+
+
+def _get_agent(agent_type: str) -> BaseAgent:
+    """Get (and create on first use) the singleton for an agent type."""
+    agent = _instances.get(agent_type)
+    if agent is None:
+        agent = _instances[agent_type] = _AGENT_CLASSES[agent_type]()
+    return agent
+
+
+def __getattr__(name: str) -> BaseAgent:
+    if name in _AGENT_CLASSES:
+        return _get_agent(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Register all agents
 def register_agents():
     """Register all agents with the registry."""
-    agent_registry.register("orchestrator", orchestrator)
-    agent_registry.register("customer_support", customer_support)
-    agent_registry.register("medicine_search", medicine_search)
-    agent_registry.register("prescription_validation", prescription_validation)
-    agent_registry.register("order_processing", order_processing)
-    agent_registry.register("compliance_safety", compliance_safety)
+    for agent_type in _AGENT_CLASSES:
+        agent_registry.register(agent_type, _get_agent(agent_type))
 
 
 __all__ = [
@@ -1,9 +1,15 @@
 """
 Base agent class for all AI agents in the pharmacy system.
 """
+import asyncio
+import functools
+import hashlib
+import inspect
 import json
+import time
 import uuid
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from datetime import datetime
 from typing import Any, Dict, List, Optional, TypeVar, Generic
 from pydantic import BaseModel, Field
@@ -13,6 +19,58 @@ from app.core.config import settings
 
 logger = structlog.get_logger()
 
+try:
+    import orjson
+
+    def json_dumps(obj: Any, sort_keys: bool = False) -> bytes:
+        """Serialize to JSON bytes (orjson, Rust-accelerated)."""
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+
+    json_loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson is in requirements
+    def json_dumps(obj: Any, sort_keys: bool = False) -> bytes:
+        """Serialize to JSON bytes (stdlib fallback)."""
+        return json.dumps(obj, sort_keys=sort_keys).encode()
+
+    json_loads = json.loads
+
+# Max entries kept in the per-agent LLM response cache, and how long a
+# cached response stays servable. The TTL bounds staleness the same way a
+# Redis EX would; entries are evicted lazily on lookup.
+_LLM_CACHE_MAX = 512
+_LLM_CACHE_TTL = 600.0
+
+# Shared response_format literal: every agent asks for JSON mode, so one
+# frozen dict serves all call sites instead of a fresh literal per request
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+_http_client = None
+
+
+def shared_http_client():
+    """Process-wide pooled HTTP client backing every agent's OpenAI traffic.
+
+    One connection pool across all agents means TLS/TCP setup is paid once
+    per upstream host instead of once per agent instance, and keep-alive
+    connections are reused across requests.
+    """
+    global _http_client
+    if _http_client is None:
+        import httpx
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+            timeout=60.0,
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client; called from application shutdown."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 
 class AgentInput(BaseModel):
     """Base input schema for all agents."""
@@ -38,6 +96,34 @@ class AgentOutput(BaseModel):
     escalation_needed: bool = False
 
 
+def fast_agent_output(
+    success: bool = True,
+    data: Optional[Dict[str, Any]] = None,
+    error: Optional[str] = None,
+    error_code: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    confidence: float = 1.0,
+    escalation_needed: bool = False
+) -> AgentOutput:
+    """Build an AgentOutput without running Pydantic validation.
+
+    Agents construct outputs from values they built themselves, so the
+    field re-validation is pure overhead on the hot path; model_construct
+    skips it.
+    """
+    return AgentOutput.model_construct(
+        success=success,
+        message_id=str(uuid.uuid4()),
+        timestamp=datetime.utcnow(),
+        data=data if data is not None else {},
+        error=error,
+        error_code=error_code,
+        metadata=metadata if metadata is not None else {},
+        confidence=confidence,
+        escalation_needed=escalation_needed
+    )
+
+
 class AgentTool:
     """Tool that an agent can use."""
     
@@ -46,21 +132,27 @@ class AgentTool:
         self.description = description
         self.handler = handler
         self.parameters = parameters
-    
+        # Schemas are immutable after construction; serialize once here
+        # instead of rebuilding the dict on every LLM call
+        self._openai_schema = {
+            "type": "function",
+            "function": {
+                "name": name,
+                "description": description,
+                "parameters": parameters
+            }
+        }
+
     async def execute(self, **kwargs) -> Any:
         """Execute the tool."""
-        return await self.handler(**kwargs)
+        result = self.handler(**kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
     
     def to_openai_function(self) -> Dict[str, Any]:
         """Convert to OpenAI function format."""
-        return {
-            "type": "function",
-            "function": {
-                "name": self.name,
-                "description": self.description,
-                "parameters": self.parameters
-            }
-        }
+        return self._openai_schema
 
 
 class BaseAgent(ABC):
@@ -81,44 +173,118 @@ class BaseAgent(ABC):
         self.temperature = temperature or settings.OPENAI_TEMPERATURE
         self.max_tokens = max_tokens or settings.OPENAI_MAX_TOKENS
         self.tools = tools or []
-        self.logger = logger.bind(agent_type=agent_type)
-        
-        # Initialize OpenAI client
+        self._tools_by_name = {t.name: t for t in self.tools}
+        self._tool_schemas = [t._openai_schema for t in self.tools]
+        self._llm_cache: OrderedDict[str, tuple] = OrderedDict()
+        # The static prompt never changes, so its message dict is built once;
+        # the common no-context call shares one prebuilt list as well
+        self._system_message = {"role": "system", "content": system_prompt}
+        self._base_messages = [self._system_message]
+
+    @functools.cached_property
+    def client(self):
+        """OpenAI client, created lazily on first LLM call.
+
+        Importing openai pulls in httpx and friends; deferring it keeps
+        agent construction (and cold start) cheap for paths that never
+        reach the LLM.
+        """
         from openai import AsyncOpenAI
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        return AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            http_client=shared_http_client()
+        )
     
     @abstractmethod
     async def process(self, input_data: AgentInput) -> AgentOutput:
         """Process the input and return output."""
         pass
+
+    async def process_batch(
+        self,
+        inputs: List[AgentInput],
+        concurrency: int = 10
+    ) -> List[AgentOutput]:
+        """Process multiple inputs concurrently.
+
+        Results are returned in input order; concurrency bounds how many
+        inputs are in flight at once so batch callers don't exhaust the
+        LLM rate limit.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _one(input_data: AgentInput) -> AgentOutput:
+            async with semaphore:
+                return await self.process(input_data)
+
+        return await asyncio.gather(*(_one(i) for i in inputs))
     
     async def call_llm(
         self,
         messages: List[Dict[str, str]],
         tools: Optional[List[AgentTool]] = None,
         response_format: Optional[Dict[str, str]] = None,
-        temperature: Optional[float] = None
+        temperature: Optional[float] = None,
+        cache: bool = True,
+        stream: bool = False
     ) -> Dict[str, Any]:
         """Call the LLM with the given messages."""
         try:
-            all_tools = self.tools + (tools or [])
-            
+            if tools:
+                all_tools = self._tool_schemas + [t.to_openai_function() for t in tools]
+            else:
+                all_tools = self._tool_schemas
+
             params = {
                 "model": self.model,
                 "messages": messages,
                 "temperature": temperature or self.temperature,
                 "max_tokens": self.max_tokens,
             }
-            
+
             if all_tools:
-                params["tools"] = [t.to_openai_function() for t in all_tools]
-            
+                params["tools"] = all_tools
+
             if response_format:
                 params["response_format"] = response_format
-            
+
+            # Identical prompts repeat often (same FAQ questions, same routing
+            # messages); cache plain completions so repeats skip the network
+            # round-trip. Tool-calling responses are side-effecting, so only
+            # tool-free calls are cached.
+            cacheable = cache and not all_tools and not stream
+            cache_key = None
+            if cacheable:
+                cache_key = hashlib.blake2b(
+                    json_dumps(params, sort_keys=True),
+                    digest_size=16
+                ).hexdigest()
+                entry = self._llm_cache.get(cache_key)
+                if entry is not None:
+                    expires_at, cached = entry
+                    if time.monotonic() < expires_at:
+                        self._llm_cache.move_to_end(cache_key)
+                        return cached
+                    del self._llm_cache[cache_key]
+
+            if stream:
+                # Assemble the content incrementally instead of buffering the
+                # whole response object; usage is not reported on stream chunks.
+                chunks = []
+                async for chunk in await self.client.chat.completions.create(stream=True, **params):
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        chunks.append(delta)
+                return {
+                    "success": True,
+                    "content": "".join(chunks),
+                    "tool_calls": None,
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+                }
+
             response = await self.client.chat.completions.create(**params)
-            
-            return {
+
+            result = {
                 "success": True,
                 "content": response.choices[0].message.content,
                 "tool_calls": response.choices[0].message.tool_calls,
@@ -128,8 +294,15 @@ class BaseAgent(ABC):
                     "total_tokens": response.usage.total_tokens
                 }
             }
+
+            if cacheable and not result["tool_calls"]:
+                self._llm_cache[cache_key] = (time.monotonic() + _LLM_CACHE_TTL, result)
+                if len(self._llm_cache) > _LLM_CACHE_MAX:
+                    self._llm_cache.popitem(last=False)
+
+            return result
         except Exception as e:
-            self.logger.error("llm_call_failed", error=str(e))
+            logger.error("llm_call_failed", agent_type=self.agent_type, error=str(e))
             return {
                 "success": False,
                 "error": str(e),
@@ -141,22 +314,29 @@ class BaseAgent(ABC):
         tool_name = tool_call.function.name
         arguments = json.loads(tool_call.function.arguments)
         
-        tool = next((t for t in self.tools if t.name == tool_name), None)
+        tool = self._tools_by_name.get(tool_name)
         if not tool:
-            return json.dumps({"error": f"Tool {tool_name} not found"})
-        
+            return json_dumps({"error": f"Tool {tool_name} not found"}).decode()
+
         try:
             result = await tool.execute(**arguments)
-            return json.dumps({"result": result})
+            return json_dumps({"result": result}).decode()
         except Exception as e:
-            return json.dumps({"error": str(e)})
+            return json_dumps({"error": str(e)}).decode()
     
-    def create_system_message(self, additional_context: Optional[str] = None) -> Dict[str, str]:
-        """Create system message with prompt."""
-        content = self.system_prompt
+    def create_system_messages(self, additional_context: Optional[str] = None) -> List[Dict[str, str]]:
+        """Create system messages with prompt.
+
+        The static system prompt is kept as its own message so providers can
+        serve it from their prompt cache; dynamic context goes in a separate
+        trailing message instead of being concatenated onto the prompt.
+        """
         if additional_context:
-            content += f"\n\nAdditional Context:\n{additional_context}"
-        return {"role": "system", "content": content}
+            return [
+                self._system_message,
+                {"role": "system", "content": f"Additional Context:\n{additional_context}"}
+            ]
+        return self._base_messages
     
     async def log_action(
         self,
@@ -166,8 +346,11 @@ class BaseAgent(ABC):
         tokens: Dict[str, int]
     ):
         """Log agent action for auditing."""
-        # This would write to the agent_logs table
-        self.logger.info(
+        # This would write to the agent_logs table. The module logger is
+        # shared by all agents; per-request context comes from the
+        # contextvars bound around process() rather than per-instance
+        # logger.bind clones.
+        logger.info(
             "agent_action",
             agent_type=self.agent_type,
             user_id=input_data.user_id,
@@ -178,28 +361,20 @@ class BaseAgent(ABC):
         )
 
 
-class AgentRegistry:
-    """Registry for managing agent instances."""
-    
-    _instance = None
-    _agents: Dict[str, BaseAgent] = {}
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
-    
+class AgentRegistry(dict):
+    """Registry mapping agent type to agent instance.
+
+    A plain dict subclass: lookups go through the C-level dict.get instead
+    of a singleton wrapper, which matters in the orchestrator hot path.
+    """
+
     def register(self, agent_type: str, agent: BaseAgent):
         """Register an agent."""
-        self._agents[agent_type] = agent
-    
-    def get(self, agent_type: str) -> Optional[BaseAgent]:
-        """Get an agent by type."""
-        return self._agents.get(agent_type)
-    
+        self[agent_type] = agent
+
     def list_agents(self) -> List[str]:
         """List all registered agent types."""
-        return list(self._agents.keys())
+        return list(self)
 
 
 # Global registry instance
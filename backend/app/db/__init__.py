@@ -1,6 +1,6 @@
 """
 Database module.
 """
-from app.db.base import Base, engine, AsyncSessionLocal, get_db, init_db, close_db
+from app.db.base import Base, engine, AsyncSessionLocal, get_db, get_readonly_db, init_db, close_db
 
-__all__ = ["Base", "engine", "AsyncSessionLocal", "get_db", "init_db", "close_db"]
+__all__ = ["Base", "engine", "AsyncSessionLocal", "get_db", "get_readonly_db", "init_db", "close_db"]
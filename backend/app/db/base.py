@@ -1,34 +1,133 @@
 """
 SQLAlchemy base model and database setup.
 """
-from datetime import datetime
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
 from typing import Any, Dict
-from sqlalchemy import Column, DateTime, func
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, AsyncAttrs
-from sqlalchemy.orm import declarative_base, sessionmaker, declared_attr
+
+import orjson
+from sqlalchemy import Column, DateTime, text as sa_text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine, AsyncAttrs
+from sqlalchemy.orm import declarative_base, declared_attr
+from sqlalchemy.pool import NullPool
 
 from app.core.config import settings
 
 
+def uuid7() -> uuid.UUID:
+    """Time-ordered UUID (RFC 9562 version 7) for primary key defaults.
+
+    Random v4 keys scatter inserts across the whole B-tree, dirtying a
+    page per row on write-heavy tables; v7 keys lead with a 48-bit
+    millisecond timestamp, so inserts append at the right edge and bulk
+    loads stay page-local. Same idea as ULID, but it stays a UUID, so
+    column types, FKs and as_uuid handling don't change.
+    """
+    ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")  # 80 random bits
+    return uuid.UUID(int=(
+        ((ms & ((1 << 48) - 1)) << 80)
+        | (0x7 << 76)                        # version
+        | (((rand >> 68) & 0xFFF) << 64)     # rand_a
+        | (0b10 << 62)                       # variant
+        | (rand & ((1 << 62) - 1))           # rand_b
+    ))
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# Conversion helpers for the hand-written to_dict() serializers. A bound
+# local to one of these is cheaper per call than re-evaluating the inline
+# conditional expressions, and `is not None` fixes the truthiness variants
+# that turned legitimate zero amounts into null.
+def to_num(value) -> Any:
+    """Decimal/Numeric column value to float, passing None through."""
+    return float(value) if value is not None else None
+
+
+def to_iso(value) -> Any:
+    """datetime/date column value to ISO-8601 string, passing None through."""
+    return value.isoformat() if value is not None else None
+
+
+def _json_default(value) -> Any:
+    """orjson fallback for column types it doesn't serialize natively."""
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def json_bytes(payload) -> bytes:
+    """Encode a payload straight to JSON bytes.
+
+    orjson handles UUID/datetime/date natively in C, so serializers that
+    use this can pass raw column values and skip the per-field str()/
+    isoformat() calls a to_dict() round-trip pays; Decimal goes through
+    the default hook as float, matching the to_dict() convention.
+    """
+    return orjson.dumps(payload, default=_json_default)
+
+
+def _column_is_datetime(column) -> bool:
+    """Whether a column's Python type is datetime (decided once per class)."""
+    try:
+        return issubclass(column.type.python_type, datetime)
+    except NotImplementedError:
+        return False
+
+
 class BaseModel(AsyncAttrs):
     """Base model with common columns and methods."""
-    
+
     @declared_attr.directive
     def __tablename__(cls) -> str:
         return cls.__name__.lower()
-    
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
-    
+
+    # Client-side UTC timestamps: server_default=func.now() made Postgres
+    # compute now() and ship it back in a RETURNING clause on every INSERT.
+    # Python-side defaults need no RETURNING, which also unlocks multi-row
+    # bulk inserts (and the COPY-based log sink) with one round-trip.
+    created_at = Column(DateTime(timezone=True), default=_utcnow)
+    updated_at = Column(DateTime(timezone=True), default=_utcnow, onupdate=_utcnow)
+
+    @classmethod
+    def _build_to_dict_impl(cls):
+        """Compile a straight-line serializer for cls's columns.
+
+        Column metadata never changes after mapping, so instead of walking
+        a cached (name, is_datetime) plan per call, generate the fully
+        unrolled dict literal once per class and compile it - no loop, no
+        per-field branch, just attribute reads. Models with hand-written
+        to_dict overrides are already this shape and keep their literals.
+        """
+        lines = ["def _to_dict(self):", "    return {"]
+        for column in cls.__table__.columns:
+            value = f"self.{column.name}"
+            if _column_is_datetime(column):
+                # Inlined rather than through to_iso(): isoformat() is
+                # already C in CPython, so the helper call would be the
+                # only Python-level overhead left per datetime field.
+                value = f"None if {value} is None else {value}.isoformat()"
+            lines.append(f"        {column.name!r}: {value},")
+        lines.append("    }")
+        namespace: Dict[str, Any] = {}
+        exec(compile("\n".join(lines), f"<to_dict:{cls.__name__}>", "exec"), namespace)
+        impl = namespace["_to_dict"]
+        cls._to_dict_impl = impl
+        return impl
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert model to dictionary."""
-        result = {}
-        for column in self.__table__.columns:
-            value = getattr(self, column.name)
-            if isinstance(value, datetime):
-                value = value.isoformat()
-            result[column.name] = value
-        return result
+        # __dict__ lookup so a subclass never inherits a sibling's serializer
+        impl = self.__class__.__dict__.get("_to_dict_impl")
+        if impl is None:
+            impl = self.__class__._build_to_dict_impl()
+        return impl(self)
     
     def __repr__(self) -> str:
         columns = [f"{col.name}={getattr(self, col.name)}" for col in self.__table__.columns]
@@ -37,21 +136,43 @@ class BaseModel(AsyncAttrs):
 
 Base = declarative_base(cls=BaseModel)
 
-# Create async engine
+# Create async engine. Behind PgBouncer in transaction mode the server-side
+# pooling already multiplexes connections, so SQLAlchemy's own pool would
+# just hoard client slots (pool_size * workers of them, ~10MB of backend RAM
+# each when idle); NullPool hands every connection straight back. asyncpg's
+# prepared-statement caches must also be off there - statements prepared on
+# one server connection aren't visible on the next one the transaction gets.
+if settings.PGBOUNCER_ENABLED:
+    _engine_kwargs = {
+        "poolclass": NullPool,
+        "connect_args": {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+        },
+    }
+else:
+    _engine_kwargs = {
+        "pool_size": settings.DATABASE_POOL_SIZE,
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+        "pool_pre_ping": True,
+    }
+
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
-    pool_size=settings.DATABASE_POOL_SIZE,
-    max_overflow=settings.DATABASE_MAX_OVERFLOW,
-    pool_pre_ping=True,
+    **_engine_kwargs,
 )
 
-# Create async session factory
-AsyncSessionLocal = sessionmaker(
+# Create async session factory (async_sessionmaker is the 2.x async API;
+# the sessionmaker + class_=AsyncSession spelling was the 1.4 bridge).
+# autoflush=False matters for serialization: with it on, every relationship
+# access inside a to_dict() loop re-checks pending state and may flush
+# mid-render. The contract is that handlers flush/commit explicitly at
+# write boundaries; bulk renders mixed with pending writes can still scope
+# it with `with session.no_autoflush:`.
+AsyncSessionLocal = async_sessionmaker(
     engine,
-    class_=AsyncSession,
     expire_on_commit=False,
-    autocommit=False,
     autoflush=False,
 )
 
@@ -69,9 +190,27 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+async def get_readonly_db() -> AsyncSession:
+    """Session dependency for GET endpoints.
+
+    get_db commits on every request, which forces a WAL sync that does
+    nothing useful for pure reads. This variant marks the connection
+    read-only (so Postgres rejects stray writes and a pooler can route the
+    query to a replica) and skips the commit entirely.
+    """
+    async with AsyncSessionLocal() as session:
+        await session.connection(
+            execution_options={"postgresql_readonly": True}
+        )
+        yield session
+
+
 async def init_db():
     """Initialize database tables."""
     async with engine.begin() as conn:
+        # Trigram indexes (ix_med_name_trgm) need pg_trgm; create it before
+        # the tables so create_all can build the index.
+        await conn.execute(sa_text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
 
 
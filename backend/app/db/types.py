@@ -0,0 +1,54 @@
+"""
+Custom SQLAlchemy column types.
+"""
+import zlib
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+try:
+    import orjson
+
+    def _packb(value) -> bytes:
+        return orjson.dumps(value)
+
+    def _unpackb(raw: bytes):
+        return orjson.loads(raw)
+
+except ImportError:
+    import json
+
+    def _packb(value) -> bytes:
+        return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+    def _unpackb(raw: bytes):
+        return json.loads(raw)
+
+
+class CompressedJSON(TypeDecorator):
+    """JSON payload stored as zlib-compressed bytes.
+
+    For write-heavy payload columns that are never queried by JSON path
+    (agent inputs/outputs, audit snapshots, structured chat data), JSONB's
+    per-key storage overhead and server-side tokenization are pure cost.
+    Storing the orjson bytes zlib-compressed cuts bytes on disk and over
+    the wire by several times on typical LLM payloads; the decode is a
+    lazy client-side decompress + parse only when a row is actually read.
+
+    The encoding is an implementation detail of this type: swapping in
+    msgpack + zstd later is a change here plus a data migration, with no
+    model or call-site edits.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return zlib.compress(_packb(value), 6)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return _unpackb(zlib.decompress(value))
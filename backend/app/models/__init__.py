@@ -5,7 +5,7 @@ from app.models.user import User, UserAddress, UserHealthProfile
 from app.models.medicine import Category, Medicine, MedicineDetails, DrugInteraction
 from app.models.inventory import Inventory, InventoryTransaction
 from app.models.prescription import Prescription, PrescriptionItem, PharmacistReview
-from app.models.order import Order, OrderItem, Payment
+from app.models.order import Order, OrderExtras, OrderItem, Payment, PaymentExtras
 from app.models.conversation import Conversation, ChatMessage, AgentLog, AuditLog
 
 __all__ = [
@@ -22,8 +22,10 @@ __all__ = [
     "PrescriptionItem",
     "PharmacistReview",
     "Order",
+    "OrderExtras",
     "OrderItem",
     "Payment",
+    "PaymentExtras",
     "Conversation",
     "ChatMessage",
     "AgentLog",
@@ -1,23 +1,30 @@
 """
 Conversation and chat message models.
 """
-import uuid
 from datetime import datetime
 from typing import Optional, List, Dict, Any
-from sqlalchemy import Column, String, Text, Integer, DateTime, Boolean, ForeignKey, JSONB, Index
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Text, Integer, DateTime, Boolean, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import INET, JSONB, UUID
 from sqlalchemy.orm import relationship
 
-from app.db.base import Base
+from app.db.base import Base, uuid7, to_num, to_iso
+from app.db.types import CompressedJSON
 
 
 class Conversation(Base):
     """Chat conversations between users and AI agents."""
     
     __tablename__ = "conversations"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+
+    # The list query is "this user's conversations, by status, newest
+    # first"; the composite lets it run as a single index scan. Its leading
+    # column replaces the old single-column user_id index.
+    __table_args__ = (
+        Index("ix_conv_user_status_created", "user_id", "status", "created_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     session_id = Column(String(100))
     
     # Metadata
@@ -38,9 +45,17 @@ class Conversation(Base):
     
     closed_at = Column(DateTime)
     
-    # Relationships
+    # Relationships. Messages load via selectin: any endpoint listing
+    # conversations renders their messages, and the default lazy load turns
+    # that into one query per conversation (N+1); selectin batches them
+    # into a single WHERE conversation_id IN (...) query.
     user = relationship("User", back_populates="conversations", foreign_keys=[user_id])
-    messages = relationship("ChatMessage", back_populates="conversation", cascade="all, delete-orphan")
+    messages = relationship(
+        "ChatMessage",
+        back_populates="conversation",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+    )
     
     def to_dict(self) -> dict:
         return {
@@ -51,8 +66,8 @@ class Conversation(Base):
             "conversation_type": self.conversation_type,
             "status": self.status,
             "satisfaction_rating": self.satisfaction_rating,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": to_iso(self.created_at),
+            "updated_at": to_iso(self.updated_at),
         }
 
 
@@ -60,9 +75,16 @@ class ChatMessage(Base):
     """Individual chat messages."""
     
     __tablename__ = "chat_messages"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # Messages are always fetched per-conversation in chronological order;
+    # the composite serves both the filter and the ORDER BY in one scan and
+    # replaces the single-column conversation_id index.
+    __table_args__ = (
+        Index("ix_chatmsg_conv_created", "conversation_id", "created_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
     
     # Message info
     message_type = Column(String(20), nullable=False)  # user, agent, system, pharmacist
@@ -72,9 +94,10 @@ class ChatMessage(Base):
     content = Column(Text, nullable=False)
     content_html = Column(Text)
     
-    # Structured data
-    structured_data = Column(JSONB)
-    
+    # Structured data. Write-heavy, never filtered by JSON path, so it
+    # skips JSONB for compressed bytes (see CompressedJSON).
+    structured_data = Column(CompressedJSON)
+
     # Media
     attachments = Column(JSONB)
     
@@ -100,7 +123,7 @@ class ChatMessage(Base):
             "attachments": self.attachments,
             "tokens_used": self.tokens_used,
             "helpful": self.helpful,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "created_at": to_iso(self.created_at),
         }
 
 
@@ -108,19 +131,31 @@ class AgentLog(Base):
     """Agent execution logs for debugging and auditing."""
     
     __tablename__ = "agent_logs"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    
+
+    # Dashboards slice logs by (agent, status, time window); the composite
+    # covers that in one scan and its leading column replaces the old
+    # single-column agent_type index. Error triage only ever reads the tiny
+    # status='error' slice, so that gets a partial index instead of paying
+    # index maintenance on every success row.
+    __table_args__ = (
+        Index("ix_agentlog_agent_status_started", "agent_type", "status", "started_at"),
+        Index("ix_agentlog_errors", "created_at", postgresql_where=text("status = 'error'")),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+
     # Agent info
-    agent_type = Column(String(50), nullable=False, index=True)
+    agent_type = Column(String(50), nullable=False)
     agent_instance_id = Column(String(100))
     
     # Request/Response
     conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id"), index=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), index=True)
     
-    input_payload = Column(JSONB)
-    output_payload = Column(JSONB)
+    # Payloads are written on every agent call and only read back during
+    # debugging, never queried by JSON path - compressed bytes, not JSONB
+    input_payload = Column(CompressedJSON)
+    output_payload = Column(CompressedJSON)
     
     # Performance
     started_at = Column(DateTime, nullable=False)
@@ -149,8 +184,8 @@ class AgentLog(Base):
             "tokens_input": self.tokens_input,
             "tokens_output": self.tokens_output,
             "error_message": self.error_message,
-            "started_at": self.started_at.isoformat() if self.started_at else None,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": to_iso(self.started_at),
+            "created_at": to_iso(self.created_at),
         }
 
 
@@ -158,11 +193,20 @@ class AuditLog(Base):
     """Compliance audit logs."""
     
     __tablename__ = "audit_logs"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    
+
+    # Compliance pulls are "what did this user do, by action, over a time
+    # range"; the composite's leading column replaces the single-column
+    # user_id index. PII reviews only touch the pii_involved slice, hence
+    # the partial index.
+    __table_args__ = (
+        Index("ix_audit_user_action_created", "user_id", "action", "created_at"),
+        Index("ix_audit_pii_created", "created_at", postgresql_where=text("pii_involved")),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+
     # Who
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     user_role = Column(String(20))
     session_id = Column(String(100))
     ip_address = Column(INET)
@@ -173,9 +217,10 @@ class AuditLog(Base):
     resource_type = Column(String(50), index=True)
     resource_id = Column(UUID(as_uuid=True))
     
-    # Details
-    before_state = Column(JSONB)
-    after_state = Column(JSONB)
+    # Details. State snapshots are written on every audited action and only
+    # decoded for replay, so they take the compressed-bytes type too.
+    before_state = Column(CompressedJSON)
+    after_state = Column(CompressedJSON)
     changes_summary = Column(Text)
     
     # Compliance
@@ -190,5 +235,5 @@ class AuditLog(Base):
             "resource_type": self.resource_type,
             "resource_id": str(self.resource_id) if self.resource_id else None,
             "pii_involved": self.pii_involved,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "created_at": to_iso(self.created_at),
         }
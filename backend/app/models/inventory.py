@@ -1,14 +1,13 @@
 """
 Inventory management models.
 """
-import uuid
 from datetime import datetime
 from typing import Optional
 from sqlalchemy import Column, String, Integer, Date, DateTime, ForeignKey, Numeric, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
-from app.db.base import Base
+from app.db.base import Base, uuid7, to_num, to_iso
 
 
 class Inventory(Base):
@@ -16,7 +15,7 @@ class Inventory(Base):
     
     __tablename__ = "inventory"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     medicine_id = Column(UUID(as_uuid=True), ForeignKey("medicines.id"), nullable=False, unique=True)
     quantity_available = Column(Integer, nullable=False, default=0)
     quantity_reserved = Column(Integer, nullable=False, default=0)
@@ -28,8 +27,11 @@ class Inventory(Base):
     expiry_date = Column(Date)
     last_counted_at = Column(DateTime)
     
-    # Relationships
-    medicine = relationship("Medicine", back_populates="inventory")
+    # Relationships. Medicine loads via selectin so stock listings that
+    # touch row.medicine batch into one IN (...) query instead of N+1;
+    # transactions stay lazy - they're an unbounded audit trail that list
+    # endpoints never render.
+    medicine = relationship("Medicine", back_populates="inventory", lazy="selectin")
     transactions = relationship("InventoryTransaction", back_populates="inventory")
     
     @property
@@ -53,7 +55,7 @@ class Inventory(Base):
             "reorder_level": self.reorder_level,
             "warehouse_location": self.warehouse_location,
             "batch_number": self.batch_number,
-            "expiry_date": self.expiry_date.isoformat() if self.expiry_date else None,
+            "expiry_date": to_iso(self.expiry_date),
             "is_low_stock": self.is_low_stock,
         }
 
@@ -63,7 +65,7 @@ class InventoryTransaction(Base):
     
     __tablename__ = "inventory_transactions"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     inventory_id = Column(UUID(as_uuid=True), ForeignKey("inventory.id"), nullable=False, index=True)
     transaction_type = Column(String(20), nullable=False, index=True)  # in, out, adjustment, return, expired
     quantity = Column(Integer, nullable=False)
@@ -88,5 +90,5 @@ class InventoryTransaction(Base):
             "reference_type": self.reference_type,
             "reference_id": str(self.reference_id) if self.reference_id else None,
             "notes": self.notes,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "created_at": to_iso(self.created_at),
         }
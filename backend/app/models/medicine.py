@@ -1,13 +1,18 @@
 """
 Medicine catalog models.
 """
-import uuid
 from typing import Optional, List, Dict, Any
-from sqlalchemy import Column, String, Text, Boolean, Numeric, Integer, Date, ForeignKey, ARRAY, JSONB, Index
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, String, Text, Boolean, Numeric, Integer, Date, ForeignKey, ARRAY, CheckConstraint, Index, UniqueConstraint, event, select
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR, UUID
+from sqlalchemy.orm import relationship, selectinload, raiseload, load_only, validates
 
-from app.db.base import Base
+from app.db.base import Base, engine, uuid7, to_num, to_iso, json_bytes
+
+
+# Categories are a small, nearly-static lookup, but every Medicine.to_dict()
+# re-serializes one; caching the dicts per id turns that into a reference
+# copy. Evicted on update/delete via the mapper events below.
+_CAT_CACHE: Dict[Any, dict] = {}
 
 
 class Category(Base):
@@ -15,7 +20,7 @@ class Category(Base):
     
     __tablename__ = "categories"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     name = Column(String(100), nullable=False)
     description = Column(Text)
     parent_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"))
@@ -24,11 +29,15 @@ class Category(Base):
     is_active = Column(Boolean, default=True)
     
     # Relationships
-    parent = relationship("Category", remote_side=[id], backref="children")
+    parent = relationship("Category", remote_side=[id], back_populates="children")
+    children = relationship("Category", back_populates="parent")
     medicines = relationship("Medicine", back_populates="category")
     
     def to_dict(self) -> dict:
-        return {
+        cached = _CAT_CACHE.get(self.id)
+        if cached is not None:
+            return cached
+        data = {
             "id": str(self.id),
             "name": self.name,
             "description": self.description,
@@ -37,14 +46,43 @@ class Category(Base):
             "display_order": self.display_order,
             "is_active": self.is_active,
         }
+        if self.id is not None:  # unflushed instances have no key yet
+            _CAT_CACHE[self.id] = data
+        return data
+
+
+@event.listens_for(Category, "after_update")
+@event.listens_for(Category, "after_delete")
+def _evict_category_cache(mapper, connection, target) -> None:
+    """Drop a category's cached serialization when its row changes."""
+    _CAT_CACHE.pop(target.id, None)
 
 
 class Medicine(Base):
     """Medicine/product catalog."""
     
     __tablename__ = "medicines"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # Free-text search ("pain reliever") runs ILIKE '%..%'/similarity()
+    # against name and generic_name; BTREE only helps prefixes, so without
+    # this every search is a seq scan. The trigram GIN makes both ILIKE and
+    # % / similarity() index-backed. Requires the pg_trgm extension, which
+    # init_db() creates before create_all.
+    __table_args__ = (
+        Index(
+            "ix_med_name_trgm",
+            "name",
+            "generic_name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops", "generic_name": "gin_trgm_ops"},
+        ),
+        # Inverted index over the generated search_tsv column: full-text
+        # queries (search_tsv @@ plainto_tsquery(..)) resolve lexeme->rows
+        # instead of scanning description text per row.
+        Index("ix_med_tsv", "search_tsv", postgresql_using="gin"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     sku = Column(String(50), unique=True, nullable=False, index=True)
     name = Column(String(255), nullable=False, index=True)
     generic_name = Column(String(255), index=True)
@@ -90,12 +128,80 @@ class Medicine(Base):
     meta_title = Column(String(255))
     meta_description = Column(Text)
     slug = Column(String(255), unique=True)
+
+    # Full-text search document, maintained by Postgres so it can never
+    # drift from the source columns. Queried via
+    # search_tsv @@ plainto_tsquery('english', :q) through ix_med_tsv.
+    search_tsv = Column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('english', coalesce(name, '') || ' ' || "
+            "coalesce(generic_name, '') || ' ' || coalesce(description, ''))",
+            persisted=True,
+        ),
+    )
     
     # Relationships
     category = relationship("Category", back_populates="medicines")
     details = relationship("MedicineDetails", back_populates="medicine", uselist=False)
     inventory = relationship("Inventory", back_populates="medicine", uselist=False)
     
+    @classmethod
+    async def bulk_copy(cls, rows: List[Dict[str, Any]]) -> None:
+        """Bulk-load catalog rows via binary COPY.
+
+        Catalog imports of 10k+ rows through the ORM are dominated by
+        per-statement parameter parsing; asyncpg's copy_records_to_table
+        streams binary tuples past all of it (the same path the log sinks
+        use). COPY skips Python column defaults, so missing id/timestamp/
+        flag values are filled from the column metadata here; search_tsv is
+        generated server-side and excluded. Ends with ANALYZE so the
+        planner sees the new row counts.
+        """
+        plan = [(c.name, c.default) for c in cls.__table__.columns if c.computed is None]
+        records = []
+        for row in rows:
+            records.append(tuple(
+                row[name] if name in row
+                else None if default is None
+                else default.arg(None) if default.is_callable
+                else default.arg
+                for name, default in plan
+            ))
+        async with engine.begin() as conn:
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                cls.__tablename__,
+                records=records,
+                columns=[name for name, _ in plan],
+            )
+            await raw.driver_connection.execute(f"ANALYZE {cls.__tablename__}")
+
+    @classmethod
+    def list_query(cls):
+        """Narrow projection for list endpoints.
+
+        List cards use about a third of the ~30 columns; load_only keeps
+        the wide TEXT fields (description, meta_description, dosage notes)
+        off the wire and out of session memory.
+        """
+        return select(cls).options(load_only(*cls.LIST_COLUMNS))
+
+    @classmethod
+    def query_for_dict(cls):
+        """Base query for rows destined for to_dict()/to_detail_dict().
+
+        Eager-loads exactly the relationships those methods read and
+        raiseload()s everything else, so a forgotten eager-load surfaces as
+        an immediate error instead of a silent per-row lazy SELECT.
+        """
+        return select(cls).options(
+            selectinload(cls.category),
+            selectinload(cls.details),
+            selectinload(cls.inventory),
+            raiseload("*"),
+        )
+
     def to_dict(self) -> dict:
         return {
             "id": str(self.id),
@@ -108,14 +214,40 @@ class Medicine(Base):
             "manufacturer": self.manufacturer,
             "prescription_required": self.prescription_required,
             "controlled_substance": self.controlled_substance,
-            "price": float(self.price) if self.price else None,
-            "compare_at_price": float(self.compare_at_price) if self.compare_at_price else None,
+            "price": to_num(self.price),
+            "compare_at_price": to_num(self.compare_at_price),
             "image_url": self.image_url,
             "is_active": self.is_active,
             "is_featured": self.is_featured,
             "slug": self.slug,
         }
     
+    def to_json_bytes(self) -> bytes:
+        """to_dict(), pre-encoded.
+
+        Handlers that only ever JSON the dict can return these bytes in a
+        Response directly; raw UUID/Decimal values go straight to orjson's
+        C encoder instead of through per-field str()/float() calls.
+        """
+        return json_bytes({
+            "id": self.id,
+            "sku": self.sku,
+            "name": self.name,
+            "generic_name": self.generic_name,
+            "description": self.description,
+            "category_id": self.category_id,
+            "category": self.category.to_dict() if self.category else None,
+            "manufacturer": self.manufacturer,
+            "prescription_required": self.prescription_required,
+            "controlled_substance": self.controlled_substance,
+            "price": self.price,
+            "compare_at_price": self.compare_at_price,
+            "image_url": self.image_url,
+            "is_active": self.is_active,
+            "is_featured": self.is_featured,
+            "slug": self.slug,
+        })
+
     def to_detail_dict(self) -> dict:
         """Full details including related data."""
         data = self.to_dict()
@@ -124,12 +256,66 @@ class Medicine(Base):
         return data
 
 
+# Columns the list endpoints actually render (mapped attributes only exist
+# once the class is fully declared, hence the post-class assignment).
+Medicine.LIST_COLUMNS = (
+    Medicine.id,
+    Medicine.sku,
+    Medicine.name,
+    Medicine.generic_name,
+    Medicine.price,
+    Medicine.compare_at_price,
+    Medicine.prescription_required,
+    Medicine.image_url,
+    Medicine.is_active,
+    Medicine.is_featured,
+    Medicine.slug,
+    Medicine.category_id,
+)
+
+
+async def fetch_medicines_with_details(session, ids) -> List["Medicine"]:
+    """Load medicines with everything to_detail_dict() reads, batched.
+
+    Iterating rows and calling to_detail_dict() lazily would fire one
+    SELECT per row per relationship (2N+1 for N medicines); selectinload
+    batches each relationship into a single IN query, so the whole fetch
+    is 4 statements regardless of N.
+    """
+    result = await session.execute(
+        select(Medicine)
+        .where(Medicine.id.in_(ids))
+        .options(
+            selectinload(Medicine.details),
+            selectinload(Medicine.inventory),
+            selectinload(Medicine.category),
+        )
+    )
+    return list(result.scalars())
+
+
 class MedicineDetails(Base):
     """Detailed medicine information."""
     
     __tablename__ = "medicine_details"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # Interaction/side-effect checks are containment queries (col @> ARRAY[..]
+    # or col && ARRAY[..]); a B-tree can't serve those, GIN indexes the
+    # elements themselves. active_ingredients is JSONB, so jsonb_path_ops
+    # keeps that index about half the size of the default opclass while still
+    # covering @>.
+    __table_args__ = (
+        Index("ix_meddet_drug_interactions_gin", "drug_interactions", postgresql_using="gin"),
+        Index("ix_meddet_side_effects_gin", "common_side_effects", postgresql_using="gin"),
+        Index(
+            "ix_meddet_active_ingredients_gin",
+            "active_ingredients",
+            postgresql_using="gin",
+            postgresql_ops={"active_ingredients": "jsonb_path_ops"},
+        ),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     medicine_id = Column(UUID(as_uuid=True), ForeignKey("medicines.id", ondelete="CASCADE"), nullable=False, unique=True)
     
     # Composition
@@ -193,16 +379,38 @@ class DrugInteraction(Base):
     """Drug interaction database."""
     
     __tablename__ = "drug_interactions"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    medicine_id_1 = Column(UUID(as_uuid=True), ForeignKey("medicines.id"), nullable=False, index=True)
-    medicine_id_2 = Column(UUID(as_uuid=True), ForeignKey("medicines.id"), nullable=False, index=True)
+
+    # Pairs are stored in canonical (smaller, larger) order, so "A with B"
+    # is one probe of the unique composite index instead of an OR over two
+    # permutations, and the same pair can't be stored twice. The unique
+    # constraint's backing index replaces the old per-column indexes.
+    __table_args__ = (
+        CheckConstraint("medicine_id_1 < medicine_id_2", name="ck_drug_pair_ordered"),
+        UniqueConstraint("medicine_id_1", "medicine_id_2", name="uq_drug_pair"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    medicine_id_1 = Column(UUID(as_uuid=True), ForeignKey("medicines.id"), nullable=False)
+    medicine_id_2 = Column(UUID(as_uuid=True), ForeignKey("medicines.id"), nullable=False)
     interaction_type = Column(String(50), nullable=False, index=True)  # minor, moderate, major, contraindicated
     description = Column(Text, nullable=False)
     mechanism = Column(Text)
     management = Column(Text)
     references = Column(ARRAY(String))
-    
+
+    @validates("medicine_id_1", "medicine_id_2")
+    def _canonical_pair_order(self, key, value):
+        """Swap the pair on assignment so medicine_id_1 < medicine_id_2."""
+        other_key = "medicine_id_2" if key == "medicine_id_1" else "medicine_id_1"
+        other = getattr(self, other_key)
+        if value is not None and other is not None and (
+            (key == "medicine_id_1" and value > other)
+            or (key == "medicine_id_2" and value < other)
+        ):
+            setattr(self, other_key, value)
+            return other
+        return value
+
     def to_dict(self) -> dict:
         return {
             "id": str(self.id),
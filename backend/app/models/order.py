@@ -1,24 +1,52 @@
 """
 Order and payment models.
 """
-import uuid
 from datetime import date, datetime
 from typing import Optional, List, Dict, Any
-from sqlalchemy import Column, String, Text, Numeric, Integer, Date, DateTime, Boolean, ForeignKey, JSONB, INET, Index
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Text, Numeric, Integer, Date, DateTime, Boolean, ForeignKey, Index, func, insert, literal_column, select, text
+from sqlalchemy.dialects.postgresql import JSONB, INET, UUID
+from sqlalchemy.orm import relationship, selectinload, raiseload, load_only, noload
 
-from app.db.base import Base
+from app.db.base import Base, uuid7, to_num, to_iso, json_bytes
 
 
 class Order(Base):
     """Customer orders."""
     
     __tablename__ = "orders"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # Fulfillment batches orders by destination postal code, which lives
+    # inside the address snapshot. Indexing the ->> expression lets Postgres
+    # serve that filter without re-parsing the JSONB document per row.
+    # "My open orders" is the hottest order query and only ever touches the
+    # in-flight statuses; the partial index covers just that slice, so it
+    # stays small and skips maintenance on the delivered/cancelled bulk.
+    __table_args__ = (
+        Index("ix_orders_ship_postal", text("(shipping_address_snapshot->>'postal_code')")),
+        Index(
+            "ix_orders_user_active",
+            "user_id",
+            "created_at",
+            postgresql_where=text(
+                "status IN ('pending', 'confirmed', 'processing', 'ready_for_pickup', 'shipped')"
+            ),
+        ),
+        # Order history is "WHERE user_id = ? ORDER BY created_at DESC
+        # LIMIT n" reading a handful of columns; INCLUDE carries those in
+        # the index leaves so the query is an index-only scan with no heap
+        # fetch per row. Its leading column also replaces the old
+        # single-column user_id index.
+        Index(
+            "ix_orders_user_created_incl",
+            "user_id",
+            "created_at",
+            postgresql_include=["status", "total_amount", "order_number", "payment_status"],
+        ),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     order_number = Column(String(50), unique=True, nullable=False, index=True)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     
     # Address
     shipping_address_id = Column(UUID(as_uuid=True), ForeignKey("user_addresses.id"))
@@ -51,20 +79,68 @@ class Order(Base):
     shipped_at = Column(DateTime)
     delivered_at = Column(DateTime)
     
-    # Notes
-    customer_notes = Column(Text)
-    internal_notes = Column(Text)
-    
     # Metadata
     ip_address = Column(INET)
-    user_agent = Column(Text)
-    
+
     # Relationships
     user = relationship("User", back_populates="orders")
-    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+    # Wide free-text lives in orders_extras (see OrderExtras). lazy="raise"
+    # keeps list scans on the narrow table but makes a serializer that needs
+    # extras without having eager-loaded it (query_for_dict does) fail
+    # loudly, instead of noload's silent None for fields that have data.
+    extras = relationship("OrderExtras", back_populates="order", uselist=False,
+                          cascade="all, delete-orphan", lazy="raise")
+    # Orders are never useful without their (few) line items, so batch-load
+    # them with one IN query instead of a lazy SELECT per order.
+    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan", lazy="selectin")
     payments = relationship("Payment", back_populates="order")
     prescription = relationship("Prescription")
     
+    @classmethod
+    def list_query(cls):
+        """Narrow projection for order-history listings."""
+        return select(cls).options(load_only(*cls.LIST_COLUMNS))
+
+    @classmethod
+    def query_for_dict(cls):
+        """Base query for rows destined for to_dict().
+
+        Eager-loads items (and their medicines) plus the linked
+        prescription, and raiseload()s the rest so a missing eager-load
+        fails loudly instead of degrading into per-row lazy SELECTs.
+        """
+        return select(cls).options(
+            selectinload(cls.items).selectinload(OrderItem.medicine),
+            selectinload(cls.prescription),
+            selectinload(cls.extras),
+            raiseload("*"),
+        )
+
+    @classmethod
+    def query_with_items_json(cls, user_id):
+        """A user's orders with their items aggregated inline as JSONB.
+
+        The selectin items loader costs one extra query per result set and
+        a plain JOIN duplicates the order row per item; jsonb_agg returns
+        each order once with a ready-made items array, so callers assign
+        row.items_json straight into the payload with no Python grouping.
+        noload() keeps the items loader from firing a redundant second
+        query on the returned entities; extras is eager-loaded because
+        to_dict() reads it and the relationship is lazy="raise".
+        """
+        items_json = func.coalesce(
+            func.jsonb_agg(func.to_jsonb(literal_column("order_items")))
+            .filter(OrderItem.id.isnot(None)),
+            text("'[]'::jsonb"),
+        ).label("items_json")
+        return (
+            select(cls, items_json)
+            .outerjoin(OrderItem)
+            .where(cls.user_id == user_id)
+            .group_by(cls.id)
+            .options(noload(cls.items), selectinload(cls.extras))
+        )
+
     def to_dict(self) -> dict:
         return {
             "id": str(self.id),
@@ -84,20 +160,71 @@ class Order(Base):
             "shipping_method": self.shipping_method,
             "tracking_number": self.tracking_number,
             "carrier": self.carrier,
-            "estimated_delivery": self.estimated_delivery.isoformat() if self.estimated_delivery else None,
-            "shipped_at": self.shipped_at.isoformat() if self.shipped_at else None,
-            "delivered_at": self.delivered_at.isoformat() if self.delivered_at else None,
-            "customer_notes": self.customer_notes,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "estimated_delivery": to_iso(self.estimated_delivery),
+            "shipped_at": to_iso(self.shipped_at),
+            "delivered_at": to_iso(self.delivered_at),
+            "customer_notes": self.extras.customer_notes if self.extras else None,
+            "created_at": to_iso(self.created_at),
         }
 
+    def to_json_bytes(self) -> bytes:
+        """to_dict(), pre-encoded; raw UUID/Decimal/datetime values go
+        straight to orjson's C encoder instead of per-field conversions."""
+        return json_bytes({
+            "id": self.id,
+            "order_number": self.order_number,
+            "user_id": self.user_id,
+            "shipping_address": self.shipping_address_snapshot,
+            "prescription_id": self.prescription_id,
+            "subtotal": self.subtotal,
+            "tax_amount": self.tax_amount,
+            "shipping_amount": self.shipping_amount,
+            "discount_amount": self.discount_amount,
+            "total_amount": self.total_amount,
+            "currency": self.currency,
+            "coupon_code": self.coupon_code,
+            "status": self.status,
+            "payment_status": self.payment_status,
+            "shipping_method": self.shipping_method,
+            "tracking_number": self.tracking_number,
+            "carrier": self.carrier,
+            "estimated_delivery": self.estimated_delivery,
+            "shipped_at": self.shipped_at,
+            "delivered_at": self.delivered_at,
+            "customer_notes": self.extras.customer_notes if self.extras else None,
+            "created_at": self.created_at,
+        })
+
+
+# Columns order listings render. (Mapped attributes only exist once the
+# class is declared, hence the post-class assignment.)
+Order.LIST_COLUMNS = (
+    Order.id,
+    Order.order_number,
+    Order.user_id,
+    Order.prescription_id,
+    Order.subtotal,
+    Order.tax_amount,
+    Order.shipping_amount,
+    Order.discount_amount,
+    Order.total_amount,
+    Order.currency,
+    Order.status,
+    Order.payment_status,
+    Order.shipping_method,
+    Order.tracking_number,
+    Order.carrier,
+    Order.estimated_delivery,
+    Order.created_at,
+)
+
 
 class OrderItem(Base):
     """Items within an order."""
     
     __tablename__ = "order_items"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     order_id = Column(UUID(as_uuid=True), ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
     medicine_id = Column(UUID(as_uuid=True), ForeignKey("medicines.id"))
     
@@ -120,6 +247,17 @@ class OrderItem(Base):
     order = relationship("Order", back_populates="items")
     medicine = relationship("Medicine")
     prescription_item = relationship("PrescriptionItem")
+
+    @classmethod
+    async def bulk_create(cls, session, rows: List[Dict[str, Any]]) -> None:
+        """Insert many items as a single multi-row INSERT.
+
+        The ORM unit-of-work path costs one INSERT..RETURNING round-trip
+        per item; a Core insert with a row list collapses an order's whole
+        cart into one statement. ids and timestamps come from the
+        client-side uuid7/_utcnow defaults, so no RETURNING is needed.
+        """
+        await session.execute(insert(cls), rows)
     
     def to_dict(self) -> dict:
         return {
@@ -135,13 +273,28 @@ class OrderItem(Base):
             "fulfilled_quantity": self.fulfilled_quantity,
         }
 
+    def to_json_bytes(self) -> bytes:
+        """to_dict(), pre-encoded (see Order.to_json_bytes)."""
+        return json_bytes({
+            "id": self.id,
+            "order_id": self.order_id,
+            "medicine_id": self.medicine_id,
+            "medicine_name": self.medicine_name,
+            "medicine_sku": self.medicine_sku,
+            "unit_price": self.unit_price,
+            "quantity": self.quantity,
+            "total_price": self.total_price,
+            "prescription_item_id": self.prescription_item_id,
+            "fulfilled_quantity": self.fulfilled_quantity,
+        })
+
 
 class Payment(Base):
     """Payment records."""
     
     __tablename__ = "payments"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     order_id = Column(UUID(as_uuid=True), ForeignKey("orders.id"), nullable=False, index=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     
@@ -174,13 +327,18 @@ class Payment(Base):
     
     # Fraud check
     fraud_score = Column(Numeric(3, 2))
-    fraud_flags = Column(JSONB)
-    
-    # Response
-    provider_response = Column(JSONB)
-    
+
     # Relationships
     order = relationship("Order", back_populates="payments")
+    # Raw gateway payloads live in payments_extras (see PaymentExtras);
+    # lazy="raise" so a missed eager-load errors rather than reading None.
+    extras = relationship("PaymentExtras", back_populates="payment", uselist=False,
+                          cascade="all, delete-orphan", lazy="raise")
+
+    @classmethod
+    async def bulk_create(cls, session, rows: List[Dict[str, Any]]) -> None:
+        """One multi-row INSERT for payment fan-out (see OrderItem.bulk_create)."""
+        await session.execute(insert(cls), rows)
     
     def to_dict(self) -> dict:
         return {
@@ -192,7 +350,43 @@ class Payment(Base):
             "card_last_four": self.card_last_four,
             "card_brand": self.card_brand,
             "status": self.status,
-            "authorized_at": self.authorized_at.isoformat() if self.authorized_at else None,
-            "captured_at": self.captured_at.isoformat() if self.captured_at else None,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "authorized_at": to_iso(self.authorized_at),
+            "captured_at": to_iso(self.captured_at),
+            "created_at": to_iso(self.created_at),
         }
+
+
+class OrderExtras(Base):
+    """Cold companion row for Order (1:1, order_id is the PK).
+
+    The free-text columns are the widest on the old orders layout and no
+    list view reads them; keeping them in their own table means order list
+    scans touch only the narrow hot rows.
+    """
+
+    __tablename__ = "orders_extras"
+
+    order_id = Column(UUID(as_uuid=True), ForeignKey("orders.id", ondelete="CASCADE"), primary_key=True)
+    customer_notes = Column(Text)
+    internal_notes = Column(Text)
+    user_agent = Column(Text)
+
+    # Relationships
+    order = relationship("Order", back_populates="extras")
+
+
+class PaymentExtras(Base):
+    """Cold companion row for Payment (1:1, payment_id is the PK).
+
+    Raw gateway responses and fraud payloads are audit material, not
+    request-path data; parking the JSONB here keeps payment lookups narrow.
+    """
+
+    __tablename__ = "payments_extras"
+
+    payment_id = Column(UUID(as_uuid=True), ForeignKey("payments.id", ondelete="CASCADE"), primary_key=True)
+    provider_response = Column(JSONB)
+    fraud_flags = Column(JSONB)
+
+    # Relationships
+    payment = relationship("Payment", back_populates="extras")
@@ -1,22 +1,45 @@
 """
 Prescription management models.
 """
-import uuid
 from datetime import date, datetime
 from typing import Optional, List, Dict, Any
-from sqlalchemy import Column, String, Text, Date, DateTime, Boolean, Integer, ForeignKey, Numeric, JSONB, Index
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Computed, String, Text, Date, DateTime, Boolean, Integer, ForeignKey, Numeric, Index, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 
-from app.db.base import Base
+from app.db.base import Base, uuid7, to_num, to_iso
 
 
 class Prescription(Base):
     """Prescription records."""
     
     __tablename__ = "prescriptions"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # Pharmacists look prescriptions up by the rx number the OCR pass
+    # extracted; an expression index on the ->> access makes that an index
+    # scan instead of parsing extracted_data on every row.
+    # The validation worker and review queue only ever scan the (small)
+    # pending slice; a partial index keeps that lookup tight without paying
+    # index maintenance on every validated row.
+    __table_args__ = (
+        Index("ix_prescriptions_extracted_rxnum", text("(extracted_data->>'rx_number')")),
+        Index(
+            "ix_rx_user_pending",
+            "user_id",
+            postgresql_where=text("validation_status = 'pending'"),
+        ),
+        # Usable-prescription lookups hit only the can_be_used_cached slice;
+        # expiration_date rides along so the date check (which can't live in
+        # the generated column, see below) is answered from the index.
+        Index(
+            "ix_rx_usable",
+            "user_id",
+            "expiration_date",
+            postgresql_where=text("can_be_used_cached"),
+        ),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     
     # Prescription info
@@ -53,10 +76,24 @@ class Prescription(Base):
     status = Column(String(20), default="active", index=True)  # active, used, expired, cancelled
     usage_count = Column(Integer, default=0)
     max_uses = Column(Integer, default=1)
+
+    # Stored server-side so order flows can filter usable prescriptions with
+    # an index lookup instead of loading rows to evaluate Python. Generation
+    # expressions must be immutable, so the CURRENT_DATE comparison can't go
+    # here - expiry is checked at query time via ix_rx_usable.
+    can_be_used_cached = Column(
+        Boolean,
+        Computed(
+            "status = 'active' AND validation_status = 'valid' AND usage_count < max_uses",
+            persisted=True,
+        ),
+    )
     
     # Relationships
     user = relationship("User", back_populates="prescriptions", foreign_keys=[user_id])
-    items = relationship("PrescriptionItem", back_populates="prescription", cascade="all, delete-orphan")
+    # A prescription is always read together with its handful of items;
+    # selectin batches them into one IN query per result set.
+    items = relationship("PrescriptionItem", back_populates="prescription", cascade="all, delete-orphan", lazy="selectin")
     reviews = relationship("PharmacistReview", back_populates="prescription")
     
     @property
@@ -67,6 +104,10 @@ class Prescription(Base):
     
     @property
     def can_be_used(self) -> bool:
+        # Persisted rows carry the server-computed flag; instances not yet
+        # flushed (cached column still None) fall back to evaluating it.
+        if self.can_be_used_cached is not None:
+            return self.can_be_used_cached and not self.is_expired
         return (
             self.status == "active" and
             self.validation_status == "valid" and
@@ -84,16 +125,16 @@ class Prescription(Base):
             "doctor_name": self.doctor_name,
             "doctor_npi": self.doctor_npi,
             "patient_name_on_rx": self.patient_name_on_rx,
-            "issue_date": self.issue_date.isoformat() if self.issue_date else None,
-            "expiration_date": self.expiration_date.isoformat() if self.expiration_date else None,
+            "issue_date": to_iso(self.issue_date),
+            "expiration_date": to_iso(self.expiration_date),
             "validation_status": self.validation_status,
-            "validation_confidence": float(self.validation_confidence) if self.validation_confidence else None,
+            "validation_confidence": to_num(self.validation_confidence),
             "status": self.status,
             "usage_count": self.usage_count,
             "max_uses": self.max_uses,
             "can_be_used": self.can_be_used,
             "is_expired": self.is_expired,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "created_at": to_iso(self.created_at),
         }
 
 
@@ -102,7 +143,7 @@ class PrescriptionItem(Base):
     
     __tablename__ = "prescription_items"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     prescription_id = Column(UUID(as_uuid=True), ForeignKey("prescriptions.id", ondelete="CASCADE"), nullable=False, index=True)
     medicine_id = Column(UUID(as_uuid=True), ForeignKey("medicines.id"))
     medicine_name_on_rx = Column(String(255))
@@ -144,7 +185,7 @@ class PharmacistReview(Base):
     
     __tablename__ = "pharmacist_reviews"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     prescription_id = Column(UUID(as_uuid=True), ForeignKey("prescriptions.id"), nullable=False, index=True)
     pharmacist_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     
@@ -171,11 +212,11 @@ class PharmacistReview(Base):
             "pharmacist_id": str(self.pharmacist_id),
             "review_status": self.review_status,
             "priority": self.priority,
-            "reviewed_at": self.reviewed_at.isoformat() if self.reviewed_at else None,
+            "reviewed_at": to_iso(self.reviewed_at),
             "notes": self.notes,
             "rejection_reason": self.rejection_reason,
             "allergy_checked": self.allergy_checked,
             "interaction_checked": self.interaction_checked,
             "contraindication_checked": self.contraindication_checked,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "created_at": to_iso(self.created_at),
         }
@@ -1,14 +1,13 @@
 """
 User models for authentication and profile management.
 """
-import uuid
 from datetime import datetime
 from typing import Optional, List
 from sqlalchemy import Column, String, Boolean, DateTime, Date, Text, ARRAY, ForeignKey, Integer, Numeric, Index
 from sqlalchemy.dialects.postgresql import UUID, INET
 from sqlalchemy.orm import relationship
 
-from app.db.base import Base
+from app.db.base import Base, uuid7, to_num, to_iso
 
 
 class User(Base):
@@ -16,7 +15,7 @@ class User(Base):
     
     __tablename__ = "users"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     email = Column(String(255), unique=True, nullable=False, index=True)
     password_hash = Column(String(255), nullable=False)
     first_name = Column(String(100), nullable=False)
@@ -32,11 +31,17 @@ class User(Base):
     deleted_at = Column(DateTime)
     
     # Relationships
-    addresses = relationship("UserAddress", back_populates="user", cascade="all, delete-orphan")
+    # Users carry a handful of addresses at most; selectin loads them in one
+    # IN query. orders/prescriptions/conversations stay lazy - those grow
+    # unbounded and most reads never touch them.
+    addresses = relationship("UserAddress", back_populates="user", cascade="all, delete-orphan", lazy="selectin")
     health_profile = relationship("UserHealthProfile", back_populates="user", uselist=False, cascade="all, delete-orphan")
-    prescriptions = relationship("Prescription", back_populates="user")
+    # prescriptions and conversations each carry a second FK to users
+    # (validated_by / escalated_to), so the join column must be named on
+    # both sides or the mappers refuse to configure.
+    prescriptions = relationship("Prescription", back_populates="user", foreign_keys="Prescription.user_id")
     orders = relationship("Order", back_populates="user")
-    conversations = relationship("Conversation", back_populates="user")
+    conversations = relationship("Conversation", back_populates="user", foreign_keys="Conversation.user_id")
     
     @property
     def full_name(self) -> str:
@@ -49,11 +54,11 @@ class User(Base):
             "first_name": self.first_name,
             "last_name": self.last_name,
             "phone": self.phone,
-            "date_of_birth": self.date_of_birth.isoformat() if self.date_of_birth else None,
+            "date_of_birth": to_iso(self.date_of_birth),
             "role": self.role,
             "is_active": self.is_active,
             "is_verified": self.is_verified,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "created_at": to_iso(self.created_at),
         }
 
 
@@ -62,7 +67,7 @@ class UserAddress(Base):
     
     __tablename__ = "user_addresses"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     address_type = Column(String(20), default="home")
     street_address = Column(Text, nullable=False)
@@ -89,8 +94,8 @@ class UserAddress(Base):
             "postal_code": self.postal_code,
             "country": self.country,
             "is_default": self.is_default,
-            "latitude": float(self.latitude) if self.latitude else None,
-            "longitude": float(self.longitude) if self.longitude else None,
+            "latitude": to_num(self.latitude),
+            "longitude": to_num(self.longitude),
         }
 
 
@@ -98,8 +103,17 @@ class UserHealthProfile(Base):
     """User health information including allergies and conditions."""
     
     __tablename__ = "user_health_profile"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # The safety agents ask "does this profile contain drug X / condition Y",
+    # which is array containment (col @> ARRAY[..]). GIN indexes the array
+    # elements so those checks stop being sequential scans.
+    __table_args__ = (
+        Index("ix_uhp_allergies_gin", "allergies", postgresql_using="gin"),
+        Index("ix_uhp_conditions_gin", "medical_conditions", postgresql_using="gin"),
+        Index("ix_uhp_medications_gin", "current_medications", postgresql_using="gin"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True)
     allergies = Column(ARRAY(String))
     medical_conditions = Column(ARRAY(String))
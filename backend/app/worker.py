@@ -0,0 +1,72 @@
+"""
+Celery worker for long-running agent tasks.
+
+Agent calls that wrap OCR + LLM latency (seconds per invocation) run here
+instead of inside HTTP request handlers, so the API returns immediately and
+throughput scales with worker count rather than open-connection count.
+"""
+import asyncio
+
+from celery import Celery
+
+from app.core.config import settings
+
+celery_app = Celery(
+    "pharmacy",
+    broker=settings.REDIS_URL,
+    backend=settings.REDIS_URL,
+)
+
+# Validation tasks get their own queue so OCR/LLM-heavy work scales on
+# dedicated workers without starving whatever lands on the default queue.
+celery_app.conf.task_routes = {
+    "app.worker.run_prescription_validation": {"queue": "validation"},
+}
+
+# One persistent event loop per worker process. asyncio.run() would build
+# and close a loop per task, but the agents hold module-level async state
+# (the shared httpx client behind AsyncOpenAI) whose connection pool binds
+# to the loop that first used it - closing that loop makes every later
+# task in the process fail with "Event loop is closed".
+_loop = None
+
+
+def _run_async(coro):
+    """Run a coroutine to completion on the process's persistent loop."""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+
+@celery_app.task(
+    bind=True,
+    max_retries=settings.AGENT_MAX_RETRIES,
+    default_retry_delay=60,
+)
+def run_prescription_validation(self, task_id: str, user_id: str, file_url: str, file_type: str) -> dict:
+    """Run the prescription validation agent outside the HTTP request."""
+    # Imported here so the web process can enqueue tasks without paying for
+    # the agent stack, and the worker only builds it once per process.
+    from app.agents import prescription_validation
+    from app.agents.base import AgentInput
+
+    agent_input = AgentInput(
+        user_id=user_id,
+        payload={
+            "prescription_file": file_url,
+            "file_type": file_type,
+        },
+    )
+
+    try:
+        result = _run_async(prescription_validation.process(agent_input))
+    except Exception as exc:
+        raise self.retry(exc=exc)
+
+    return {
+        "task_id": task_id,
+        "success": result.success,
+        "data": result.data,
+        "error": result.error,
+    }
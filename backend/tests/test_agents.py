@@ -1,6 +1,8 @@
 """
 Tests for AI Agents.
 """
+import asyncio
+
 import pytest
 from app.agents.base import AgentInput, AgentOutput
 from app.agents.orchestrator import OrchestratorAgent
@@ -79,3 +81,36 @@ async def test_orchestrator_routing():
     
     # Should route to medicine_search or customer_support
     assert result.success
+
+
+@pytest.mark.asyncio
+async def test_agents_parallel():
+    """Agents have no shared mutable state, so independent requests can run
+    concurrently; gather amortizes setup across the cases and exercises the
+    agents under concurrency instead of one-at-a-time."""
+    cases = [
+        (CustomerSupportAgent(), AgentInput(
+            user_id="test-user",
+            payload={"message": "What are your shipping options?"}
+        )),
+        (MedicineSearchAgent(), AgentInput(
+            user_id="test-user",
+            payload={"query": "pain reliever", "filters": {"in_stock_only": True}}
+        )),
+        (PrescriptionValidationAgent(), AgentInput(
+            user_id="test-user",
+            payload={
+                "prescription_file": "https://example.com/prescription.jpg",
+                "file_type": "image"
+            }
+        )),
+        (OrchestratorAgent(), AgentInput(
+            user_id="test-user",
+            payload={"message": "Find ibuprofen"}
+        )),
+    ]
+
+    results = await asyncio.gather(*[agent.process(data) for agent, data in cases])
+
+    for (agent, _), result in zip(cases, results):
+        assert result.success, f"{agent.agent_type} failed under concurrency"